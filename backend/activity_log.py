@@ -0,0 +1,131 @@
+"""
+Activity Log Writer for EN Writer
+Buffered, append-only JSONL log with size-based rotation
+"""
+
+import os
+import json
+import gzip
+import shutil
+import atexit
+import threading
+import weakref
+import logging
+from typing import Dict, List, Any
+from pathlib import Path
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Writers that may hold buffered entries; weak so the exit hook doesn't keep them alive
+_live_writers: "weakref.WeakSet[ActivityLogWriter]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_writers() -> None:
+    """Flush every live writer's buffer at interpreter exit"""
+    for writer in list(_live_writers):
+        writer.flush()
+
+
+class ActivityLogWriter:
+    """
+    Appends JSON entries to a log file one per line, buffering them in memory
+    and writing each batch with a single open/write.
+
+    When the file grows past max_bytes it is rotated like
+    logging.handlers.RotatingFileHandler (log -> log.1 -> log.2 ...), keeping
+    backup_count segments; with compress=True rotated segments are gzipped.
+    """
+
+    def __init__(self, filepath: str, buffer_size: int = 50, flush_interval: float = 5.0,
+                 max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5, compress: bool = False):
+        self.filepath = Path(filepath)
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self._timer = None
+        _live_writers.add(self)
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        """Queue an entry; it is written on the next flush"""
+        line = json.dumps(entry, ensure_ascii=False)
+        flush_now = False
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.buffer_size:
+                flush_now = True
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if flush_now:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered entries to disk, rotating first if needed; returns the number written"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            if not self._buffer:
+                return 0
+
+            lines = self._buffer
+            self._buffer = []
+            try:
+                if self.max_bytes > 0 and self.filepath.exists() and \
+                        self.filepath.stat().st_size >= self.max_bytes:
+                    self._rotate()
+
+                with open(self.filepath, 'a', encoding='utf-8') as f:
+                    f.write('\n'.join(lines) + '\n')
+                return len(lines)
+
+            except Exception as e:
+                logger.error(f"Error writing activity log {self.filepath}: {e}")
+                # Keep the entries for the next attempt
+                self._buffer = lines + self._buffer
+                return 0
+
+    def close(self) -> None:
+        """Flush buffered entries; the writer is no longer flushed at exit"""
+        self.flush()
+        _live_writers.discard(self)
+
+    def _segment_path(self, index: int) -> Path:
+        """Path of rotated segment number index"""
+        suffix = f".{index}.gz" if self.compress else f".{index}"
+        return self.filepath.with_name(self.filepath.name + suffix)
+
+    def _rotate(self) -> None:
+        """Shift rotated segments up by one and move the live file to segment 1"""
+        if self.backup_count <= 0:
+            self.filepath.unlink()
+            return
+
+        oldest = self._segment_path(self.backup_count)
+        if oldest.exists():
+            oldest.unlink()
+
+        for index in range(self.backup_count - 1, 0, -1):
+            source = self._segment_path(index)
+            if source.exists():
+                os.replace(source, self._segment_path(index + 1))
+
+        if self.compress:
+            with open(self.filepath, 'rb') as src, gzip.open(self._segment_path(1), 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            self.filepath.unlink()
+        else:
+            os.replace(self.filepath, self._segment_path(1))
+
+        logger.info(f"Rotated activity log {self.filepath}")
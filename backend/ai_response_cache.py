@@ -0,0 +1,251 @@
+"""
+AI Response Cache
+Content-addressed cache of completed AI task responses with TTL and LRU eviction
+"""
+
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(prompt_context: str, model: str, temperature: float, max_tokens: int) -> str:
+    """Key for a prompt plus the generation settings that change its output"""
+    payload = json.dumps([prompt_context, model, temperature, max_tokens])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class MemoryCacheBackend:
+    """In-process LRU store with per-entry expiry"""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """SQLite store shared across processes; evicts least recently used rows"""
+
+    def __init__(self, db_path: str = "ai_response_cache.db", max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ai_response_cache ("
+                "key TEXT PRIMARY KEY, value TEXT, expires_at REAL, last_access REAL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_ai_response_cache_access ON ai_response_cache (last_access)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM ai_response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM ai_response_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE ai_response_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ai_response_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now)
+            )
+            self._conn.execute("DELETE FROM ai_response_cache WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM ai_response_cache WHERE key IN ("
+                "SELECT key FROM ai_response_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM ai_response_cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ai_response_cache").fetchone()[0]
+
+
+class RedisCacheBackend:
+    """
+    Redis store shared across hosts. Expiry uses Redis TTLs; LRU eviction is
+    left to the server's maxmemory-policy (allkeys-lru or volatile-lru).
+    """
+
+    def __init__(self, redis_url: str = "redis://localhost:6379/0", prefix: str = "ai_response:"):
+        if not REDIS_AVAILABLE:
+            raise ImportError("redis package is required for the Redis response cache")
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(redis_url)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._client.get(self.prefix + key)
+        return json.loads(value) if value else None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        self._client.setex(self.prefix + key, max(1, int(ttl)), json.dumps(value))
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(match=self.prefix + '*'):
+            self._client.delete(key)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._client.scan_iter(match=self.prefix + '*'))
+
+
+class ResponseCache:
+    """
+    Cache front-end with hit-rate metrics. Backend errors are logged and treated
+    as misses so a broken cache never fails an AI request.
+
+    Event-loop code should use aget/aset: SQLite and Redis lookups then run on a
+    worker thread instead of stalling every other request on the loop.
+    """
+
+    def __init__(self, backend, ttl: float = 3600):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+        self._stats_lock = threading.Lock()
+
+    @property
+    def blocking(self) -> bool:
+        """Whether backend calls do disk or network I/O (everything but the in-process store)"""
+        return not isinstance(self.backend, MemoryCacheBackend)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.error(f"Response cache read failed: {e}")
+            self._count('errors')
+            value = None
+
+        self._count('misses' if value is None else 'hits')
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        try:
+            self.backend.set(key, value, self.ttl)
+            self._count('stores')
+        except Exception as e:
+            logger.error(f"Response cache write failed: {e}")
+            self._count('errors')
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """get() for event-loop callers"""
+        if not self.blocking:
+            return self.get(key)
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, key)
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        """set() for event-loop callers"""
+        if not self.blocking:
+            self.set(key, value)
+            return
+        await asyncio.get_running_loop().run_in_executor(None, self.set, key, value)
+
+    def _count(self, counter: str) -> None:
+        """Bump a metric; blocking backends are called from worker threads"""
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and hit rate"""
+        lookups = self.hits + self.misses
+        try:
+            size = len(self.backend)
+        except Exception:
+            size = None
+        return {
+            'backend': type(self.backend).__name__,
+            'size': size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'errors': self.errors,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+def create_response_cache(config: Dict[str, Any]) -> Optional[ResponseCache]:
+    """Build a ResponseCache from AI_SERVICE_CONFIG['response_cache'] (None when disabled)"""
+    backend_name = (config.get('backend') or 'none').lower()
+    max_entries = config.get('max_entries', 1000)
+
+    try:
+        if backend_name == 'memory':
+            backend = MemoryCacheBackend(max_entries)
+        elif backend_name == 'sqlite':
+            backend = SQLiteCacheBackend(config.get('sqlite_path', 'ai_response_cache.db'), max_entries)
+        elif backend_name == 'redis':
+            backend = RedisCacheBackend(config.get('redis_url', 'redis://localhost:6379/0'))
+        else:
+            return None
+    except Exception as e:
+        logger.warning(f"AI response cache disabled, {backend_name} backend unavailable: {e}")
+        return None
+
+    logger.info(f"AI response cache enabled ({backend_name}, ttl {config.get('ttl', 3600)}s)")
+    return ResponseCache(backend, ttl=config.get('ttl', 3600))
@@ -3,15 +3,31 @@ AI Automation Service Client
 Handles communication with external AI service for agentic tasks
 """
 
-import requests
+import asyncio
 import json
 import time
+import random
 import uuid
 import logging
-from typing import Dict, Any, Optional, List
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator, Iterator
 from dataclasses import dataclass
 from enum import Enum
 
+import httpx
+
+from ai_service_config import get_ai_config
+from ai_response_cache import ResponseCache, create_response_cache, make_cache_key
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 class TaskStatus(Enum):
@@ -48,35 +64,125 @@ class TaskResponse:
     logs: str = ""
     error: str = None
 
-class AIServiceClient:
-    """Client for communicating with AI Automation Service"""
+class AsyncAIServiceClient:
+    """
+    Asyncio client for the AI Automation Service.
+
+    Shares one httpx.AsyncClient connection pool (HTTP/2 when the h2 package is
+    installed) across all calls; every method accepts an optional per-call timeout.
+    """
+    
+    # First backoff delay (seconds) when the service does not long-poll
+    INITIAL_POLL_DELAY = 0.5
+    
+    # Default per-call timeouts (seconds)
+    DEFAULT_TIMEOUTS = {'create': 30.0, 'status': 10.0, 'cancel': 10.0, 'health': 5.0, 'batch': 300.0}
     
-    def __init__(self, base_url: str = None, api_key: str = None):
+    # Cap on task ids tracked for the response cache and request coalescing
+    CACHE_TRACKING_LIMIT = 1000
+    
+    # Results answered locally (cache hits, batch replies) are kept this long for get_task_status
+    RESULT_RETENTION = 900.0
+    
+    # The service's MAX_BATCH_SIZE; larger batches are split into several calls
+    MAX_BATCH_SIZE = 16
+    
+    def __init__(self, base_url: str = None, api_key: str = None,
+                 max_connections: int = 20, max_keepalive_connections: int = 10,
+                 response_cache: ResponseCache = None, circuit_breaker: CircuitBreaker = None):
         self.base_url = base_url or "https://ntbk-ai-flask-api.onrender.com"
         self.api_key = api_key or "notebooker-api-key-2024"
-        self.session = requests.Session()
         
+        # Fails calls fast while the service is down or slow
+        self.circuit_breaker = circuit_breaker
+        if circuit_breaker is not None and circuit_breaker.probe is None:
+            circuit_breaker.probe = self._probe_health
+        
+        # Results known without asking the service (cache hits, batch replies) are
+        # kept by task_id; remote tasks are remembered until they finish
+        self.response_cache = response_cache
+        self._cached_responses: "OrderedDict[str, Tuple[float, TaskResponse]]" = OrderedDict()
+        self._task_keys: "OrderedDict[str, str]" = OrderedDict()
+        
+        # Single-flight: request key -> in-flight remote task shared by identical requests
+        self._inflight_tasks: Dict[str, Dict[str, Any]] = {}
+        self._inflight_creates: Dict[str, asyncio.Future] = {}
+        self.coalesced_requests = 0
+        
+        headers = {'Content-Type': 'application/json'}
         # Set up authentication if API key provided
         if self.api_key:
-            self.session.headers.update({
-                'X-API-Key': self.api_key,
-                'Content-Type': 'application/json'
-            })
-        else:
-            self.session.headers.update({
-                'Content-Type': 'application/json'
-            })
+            headers['X-API-Key'] = self.api_key
         
-        logger.info(f"🔧 AI Service Client initialized", base_url=self.base_url, has_api_key=bool(self.api_key))
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=headers,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_keepalive_connections),
+            timeout=self.DEFAULT_TIMEOUTS['status']
+        )
+        
+        logger.info(f"🔧 AI Service Client initialized - base_url: {self.base_url}, "
+                    f"has_api_key: {bool(self.api_key)}, http2: {HTTP2_AVAILABLE}")
     
-    def create_task(self, prompt_context: str, agent_config: AgentConfig = None, 
-                   external_tool_endpoints: Dict[str, str] = None) -> str:
+    async def create_task(self, prompt_context: str, agent_config: AgentConfig = None, 
+                          external_tool_endpoints: Dict[str, str] = None,
+                          timeout: float = None) -> str:
         """
-        Create a new agentic task and return task_id
+        Create a new agentic task and return task_id.
+
+        A request identical to one still in flight (same prompt and generation
+        settings) attaches to that task and gets the same task_id.
         """
         if agent_config is None:
             agent_config = AgentConfig()
         
+        request_key = make_cache_key(prompt_context, agent_config.model,
+                                     agent_config.temperature, agent_config.max_tokens)
+        if self.response_cache is not None:
+            cached = await self.response_cache.aget(request_key)
+            if cached is not None:
+                return self._answer_from_cache(cached)
+        
+        inflight = self._inflight_tasks.get(request_key)
+        if inflight is not None and time.time() - inflight['started_at'] < agent_config.timeout:
+            inflight['waiters'] += 1
+            self.coalesced_requests += 1
+            logger.info(f"Attached to in-flight AI task {inflight['task_id']}")
+            return inflight['task_id']
+        
+        pending = self._inflight_creates.get(request_key)
+        if pending is not None:
+            task_id = await asyncio.shield(pending)
+            self._inflight_tasks[request_key]['waiters'] += 1
+            self.coalesced_requests += 1
+            logger.info(f"Attached to in-flight AI task {task_id}")
+            return task_id
+        
+        if not self.is_available():
+            raise CircuitOpenError("AI service circuit is open")
+        
+        pending = asyncio.get_running_loop().create_future()
+        # Mark a failure as retrieved even when no identical request is waiting on it
+        pending.add_done_callback(lambda future: future.exception())
+        self._inflight_creates[request_key] = pending
+        try:
+            task_id = await self._submit_task(prompt_context, agent_config, external_tool_endpoints, timeout)
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            del self._inflight_creates[request_key]
+        
+        self._inflight_tasks[request_key] = {'task_id': task_id, 'started_at': time.time(), 'waiters': 1}
+        self._track(self._task_keys, task_id, request_key)
+        pending.set_result(task_id)
+        return task_id
+    
+    async def _submit_task(self, prompt_context: str, agent_config: AgentConfig,
+                           external_tool_endpoints: Dict[str, str], timeout: float) -> str:
+        """Create the remote task"""
         task_id = str(uuid.uuid4())
         
         request_data = TaskRequest(
@@ -87,50 +193,207 @@ class AIServiceClient:
         )
         
         try:
-            logger.info(f"🚀 Creating AI task", task_id=task_id, base_url=self.base_url)
+            logger.info(f"🚀 Creating AI task {task_id} at {self.base_url}")
             start_time = time.time()
-            response = self.session.post(
-                f"{self.base_url}/api/ai/chat",
+            response = await self.client.post(
+                "/api/ai/chat",
                 json={
                     "message": prompt_context,
                     "projectId": "default",
                     "context": "Engineering notebook assistance"
                 },
-                timeout=30
+                timeout=timeout or self.DEFAULT_TIMEOUTS['create']
             )
             latency = time.time() - start_time
             
-            logger.info(f"📡 AI Service API call completed", task_id=task_id, latency=f"{latency:.2f}s", status=response.status_code)
+            logger.info(f"📡 AI Service API call completed - Task: {task_id}, Latency: {latency:.2f}s, Status: {response.status_code}")
             
             if response.status_code == 200:
-                result = response.json()
-                logger.info(f"✅ Task created successfully", task_id=task_id)
+                logger.info(f"✅ Task created successfully: {task_id}")
+                self._record_call(latency)
                 return task_id
             else:
-                logger.error(f"❌ Failed to create task", status=response.status_code, response=response.text)
+                logger.error(f"❌ Failed to create task: {response.status_code} - {response.text}")
+                self._record_call(latency, failed=response.status_code >= 500)
                 raise Exception(f"AI Service error: {response.status_code}")
                 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"🌐 Network error creating task", task_id=task_id, error=str(e))
+        except httpx.HTTPError as e:
+            logger.error(f"🌐 Network error creating task {task_id}: {e}")
+            self._record_call(failed=True)
             raise Exception(f"Network error: {e}")
     
-    def get_task_status(self, task_id: str) -> TaskResponse:
+    async def create_tasks_batch(self, prompt_contexts: List[str], agent_config: AgentConfig = None,
+                                 timeout: float = None) -> List[str]:
         """
-        Get current status of a task
+        Submit several prompts through /agentic-task/batch and return their
+        task_ids in order. Prompts in the response cache are answered from it;
+        the rest are sent in calls of at most MAX_BATCH_SIZE. The service answers
+        with every result, so get_task_status on these ids needs no further round trip.
         """
+        if agent_config is None:
+            agent_config = AgentConfig()
+        
+        task_ids: List[Optional[str]] = [None] * len(prompt_contexts)
+        pending = []
+        for index, prompt_context in enumerate(prompt_contexts):
+            request_key = make_cache_key(prompt_context, agent_config.model,
+                                         agent_config.temperature, agent_config.max_tokens)
+            cached = await self.response_cache.aget(request_key) if self.response_cache is not None else None
+            if cached is not None:
+                task_ids[index] = self._answer_from_cache(cached)
+            else:
+                pending.append((index, prompt_context, request_key))
+        
+        if pending and not self.is_available():
+            raise CircuitOpenError("AI service circuit is open")
+        
+        for start in range(0, len(pending), self.MAX_BATCH_SIZE):
+            chunk = pending[start:start + self.MAX_BATCH_SIZE]
+            chunk_ids = await self._submit_batch([prompt_context for _, prompt_context, _ in chunk],
+                                                 [request_key for _, _, request_key in chunk],
+                                                 agent_config, timeout)
+            for (index, _, _), task_id in zip(chunk, chunk_ids):
+                task_ids[index] = task_id
+        
+        return task_ids
+    
+    async def _submit_batch(self, prompt_contexts: List[str], request_keys: List[str],
+                            agent_config: AgentConfig, timeout: float) -> List[str]:
+        """One /agentic-task/batch call; results are recorded under our own task_ids"""
+        task_ids = [str(uuid.uuid4()) for _ in prompt_contexts]
+        service_config = {'temperature': agent_config.temperature, 'max_tokens': agent_config.max_tokens}
+        
         try:
+            logger.info(f"🚀 Creating batch of {len(task_ids)} AI tasks at {self.base_url}")
             start_time = time.time()
-            response = self.session.get(
-                f"{self.base_url}/agentic-task/{task_id}",
-                timeout=10
+            response = await self.client.post(
+                "/agentic-task/batch",
+                json={"tasks": [
+                    {"task_id": task_id, "prompt_context": prompt_context, "agent_config": service_config}
+                    for task_id, prompt_context in zip(task_ids, prompt_contexts)
+                ]},
+                timeout=timeout or self.DEFAULT_TIMEOUTS['batch']
+            )
+            latency = time.time() - start_time
+            
+            logger.info(f"📡 AI Service batch call completed - Tasks: {len(task_ids)}, Latency: {latency:.2f}s, Status: {response.status_code}")
+            
+            if response.status_code != 200:
+                logger.error(f"❌ Failed to create task batch: {response.status_code} - {response.text}")
+                self._record_call(failed=response.status_code >= 500)
+                raise Exception(f"AI Service error: {response.status_code}")
+            # A batch legitimately takes longer than a single call
+            self._record_call(latency / len(task_ids))
+            
+        except httpx.HTTPError as e:
+            logger.error(f"🌐 Network error creating task batch: {e}")
+            self._record_call(failed=True)
+            raise Exception(f"Network error: {e}")
+        
+        results = response.json().get('results', [])
+        if len(results) != len(task_ids):
+            raise Exception(f"AI Service returned {len(results)} results for {len(task_ids)} tasks")
+        
+        for task_id, item, request_key in zip(task_ids, results, request_keys):
+            if item.get('task_id') not in (None, task_id):
+                logger.warning(f"Batch result for {task_id} came back as {item.get('task_id')}")
+            task_response = TaskResponse(
+                task_id=task_id,
+                status=item.get('status', 'unknown'),
+                agent_reply=item.get('agent_reply', ''),
+                next_step=item.get('next_step', {}),
+                logs=item.get('logs', ''),
+                error=item.get('error')
+            )
+            self._remember_result(task_response)
+            
+            if self.response_cache is not None and task_response.status == TaskStatus.COMPLETED.value:
+                await self.response_cache.aset(request_key, {
+                    'agent_reply': task_response.agent_reply,
+                    'next_step': task_response.next_step,
+                    'logs': task_response.logs
+                })
+        
+        return task_ids
+    
+    async def stream_task(self, prompt_context: str, agent_config: AgentConfig = None,
+                          timeout: float = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run a task on /agentic-task/stream and yield its Server-Sent Events as
+        {'event': name, 'data': payload} dicts ("token" chunks, then "done")
+        """
+        if agent_config is None:
+            agent_config = AgentConfig()
+        
+        if not self.is_available():
+            raise CircuitOpenError("AI service circuit is open")
+        
+        task_id = str(uuid.uuid4())
+        start_time = time.time()
+        first_token = True
+        
+        try:
+            async with self.client.stream(
+                "POST",
+                "/agentic-task/stream",
+                json={
+                    "task_id": task_id,
+                    "prompt_context": prompt_context,
+                    "agent_config": {'temperature': agent_config.temperature, 'max_tokens': agent_config.max_tokens}
+                },
+                timeout=timeout or self.DEFAULT_TIMEOUTS['create']
+            ) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    logger.error(f"❌ Failed to stream task: {response.status_code} - {response.text}")
+                    self._record_call(failed=response.status_code >= 500)
+                    raise Exception(f"AI Service error: {response.status_code}")
+                
+                event = 'message'
+                async for line in response.aiter_lines():
+                    if line.startswith('event:'):
+                        event = line[len('event:'):].strip()
+                    elif line.startswith('data:'):
+                        if first_token:
+                            # Time to first token is what matters for a stream
+                            self._record_call(time.time() - start_time)
+                            logger.info(f"AI Service stream started - Task: {task_id}, TTFT: {time.time() - start_time:.2f}s")
+                            first_token = False
+                        yield {'event': event, 'data': json.loads(line[len('data:'):].strip())}
+                    elif not line:
+                        event = 'message'
+                
+        except httpx.HTTPError as e:
+            logger.error(f"🌐 Network error streaming task {task_id}: {e}")
+            self._record_call(failed=True)
+            raise Exception(f"Network error: {e}")
+    
+    async def get_task_status(self, task_id: str, wait: float = 0,
+                              timeout: float = None) -> TaskResponse:
+        """
+        Get current status of a task. With wait > 0 the service holds the request
+        open until the task finishes or wait seconds pass (long-poll).
+        """
+        cached = self._cached_responses.get(task_id)
+        if cached is not None:
+            return cached[1]
+        
+        try:
+            start_time = time.time()
+            response = await self.client.get(
+                f"/agentic-task/{task_id}",
+                params={'wait': wait} if wait > 0 else None,
+                timeout=(timeout or self.DEFAULT_TIMEOUTS['status']) + wait
             )
             latency = time.time() - start_time
             
             logger.info(f"AI Service status check - Task: {task_id}, Latency: {latency:.2f}s, Status: {response.status_code}")
+            # Long-poll latency reflects the task, not the service
+            self._record_call(latency if not wait else None, failed=response.status_code >= 500)
             
             if response.status_code == 200:
                 data = response.json()
-                return TaskResponse(
+                task_response = TaskResponse(
                     task_id=data.get('task_id', task_id),
                     status=data.get('status', 'unknown'),
                     agent_reply=data.get('agent_reply', ''),
@@ -138,31 +401,49 @@ class AIServiceClient:
                     logs=data.get('logs', ''),
                     error=data.get('error')
                 )
+                await self._finish_task(task_id, task_response)
+                return task_response
             else:
                 logger.error(f"Failed to get task status: {response.status_code} - {response.text}")
+                self._release_task(task_id)
                 return TaskResponse(
                     task_id=task_id,
                     status=TaskStatus.FAILED.value,
                     error=f"API error: {response.status_code}"
                 )
                 
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Network error getting task status {task_id}: {e}")
+            self._record_call(failed=True)
+            self._release_task(task_id)
             return TaskResponse(
                 task_id=task_id,
                 status=TaskStatus.FAILED.value,
                 error=f"Network error: {e}"
             )
     
-    def cancel_task(self, task_id: str) -> bool:
+    async def cancel_task(self, task_id: str, timeout: float = None) -> bool:
         """
         Cancel a running task
         """
+        if task_id in self._cached_responses:
+            return True
+        
+        # A shared task is only cancelled remotely once every request attached to it has cancelled
+        request_key = self._task_keys.get(task_id)
+        inflight = self._inflight_tasks.get(request_key)
+        if inflight is not None and inflight['task_id'] == task_id:
+            inflight['waiters'] -= 1
+            if inflight['waiters'] > 0:
+                return True
+            del self._inflight_tasks[request_key]
+        self._task_keys.pop(task_id, None)
+        
         try:
             start_time = time.time()
-            response = self.session.delete(
-                f"{self.base_url}/agentic-task/{task_id}",
-                timeout=10
+            response = await self.client.delete(
+                f"/agentic-task/{task_id}",
+                timeout=timeout or self.DEFAULT_TIMEOUTS['cancel']
             )
             latency = time.time() - start_time
             
@@ -170,50 +451,372 @@ class AIServiceClient:
             
             return response.status_code == 200
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Network error cancelling task {task_id}: {e}")
             return False
     
-    def poll_task_completion(self, task_id: str, max_wait_time: int = 300, 
-                           poll_interval: int = 5) -> TaskResponse:
+    async def poll_task_completion(self, task_id: str, max_wait_time: int = 300, 
+                                   poll_interval: int = 5, long_poll_timeout: float = 25) -> TaskResponse:
         """
-        Poll for task completion with timeout
+        Wait for task completion with timeout.
+
+        Each status request long-polls for up to long_poll_timeout seconds, so the
+        result arrives as soon as the task finishes. If the service answers early
+        without a final status (no long-poll support), falls back to polling with
+        exponential backoff and full jitter, capped at poll_interval seconds.
         """
         start_time = time.time()
+        delay = self.INITIAL_POLL_DELAY
         
-        while time.time() - start_time < max_wait_time:
-            response = self.get_task_status(task_id)
+        while True:
+            remaining = max_wait_time - (time.time() - start_time)
+            if remaining <= 0:
+                break
+            
+            wait = min(long_poll_timeout, remaining)
+            request_start = time.time()
+            response = await self.get_task_status(task_id, wait=wait)
             
             if response.status in [TaskStatus.COMPLETED.value, TaskStatus.FAILED.value, TaskStatus.CANCELLED.value]:
                 return response
             
-            time.sleep(poll_interval)
+            if not self.is_available():
+                logger.warning(f"AI service circuit opened while waiting for task {task_id}")
+                self._release_task(task_id)
+                return TaskResponse(
+                    task_id=task_id,
+                    status=TaskStatus.FAILED.value,
+                    error="AI service unavailable (circuit open)"
+                )
+            
+            if time.time() - request_start < wait:
+                remaining = max_wait_time - (time.time() - start_time)
+                await asyncio.sleep(max(0.0, min(random.uniform(0, delay), remaining)))
+                delay = min(delay * 2, poll_interval)
         
         # Timeout reached
         logger.warning(f"Task {task_id} timed out after {max_wait_time} seconds")
+        self._release_task(task_id)
         return TaskResponse(
             task_id=task_id,
             status=TaskStatus.FAILED.value,
             error="Task timeout"
         )
     
-    def health_check(self) -> bool:
+    async def health_check(self, timeout: float = None) -> bool:
         """
         Check if AI service is available
         """
         try:
-            response = self.session.get(f"{self.base_url}/health", timeout=5)
+            response = await self.client.get("/health", timeout=timeout or self.DEFAULT_TIMEOUTS['health'])
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False
+    
+    def is_available(self) -> bool:
+        """False while the circuit breaker is open"""
+        return self.circuit_breaker is None or self.circuit_breaker.allow_request()
+    
+    def _record_call(self, latency: float = None, failed: bool = False) -> None:
+        """Report a call outcome to the circuit breaker"""
+        if self.circuit_breaker is None:
+            return
+        if failed:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success(latency)
+    
+    def _probe_health(self) -> bool:
+        """Blocking health check used by the circuit breaker's background probe"""
+        try:
+            response = httpx.get(f"{self.base_url}/health", headers={'X-API-Key': self.api_key} if self.api_key else None,
+                                 timeout=self.DEFAULT_TIMEOUTS['health'])
             return response.status_code == 200
-        except:
+        except httpx.HTTPError:
             return False
+    
+    def _answer_from_cache(self, cached: Dict[str, Any]) -> str:
+        """Record a response cache hit as an already completed task and return its id"""
+        task_id = f"cached-{uuid.uuid4()}"
+        self._remember_result(TaskResponse(
+            task_id=task_id,
+            status=TaskStatus.COMPLETED.value,
+            agent_reply=cached.get('agent_reply', ''),
+            next_step=cached.get('next_step', {}),
+            logs=cached.get('logs', '')
+        ))
+        logger.info(f"Answered AI task {task_id} from response cache")
+        return task_id
+    
+    def _remember_result(self, task_response: TaskResponse) -> None:
+        """
+        Keep a locally answered result for RESULT_RETENTION seconds. Expiry is by
+        age, not count, so a large batch can't evict its own results before the
+        caller reads them.
+        """
+        now = time.time()
+        self._cached_responses[task_response.task_id] = (now, task_response)
+        while self._cached_responses:
+            stored_at, _ = next(iter(self._cached_responses.values()))
+            if now - stored_at <= self.RESULT_RETENTION:
+                break
+            self._cached_responses.popitem(last=False)
+    
+    def _track(self, mapping: OrderedDict, key: str, value: Any) -> None:
+        """Insert into a bounded tracking dict, dropping the oldest entries"""
+        mapping[key] = value
+        while len(mapping) > self.CACHE_TRACKING_LIMIT:
+            mapping.popitem(last=False)
+    
+    async def _finish_task(self, task_id: str, task_response: TaskResponse) -> None:
+        """Once a remote task finishes, release its single-flight slot and cache its result"""
+        if task_response.status not in [TaskStatus.COMPLETED.value, TaskStatus.FAILED.value, TaskStatus.CANCELLED.value]:
+            return
+        request_key = self._release_task(task_id)
+        if request_key is None:
+            return
+        
+        if self.response_cache is not None and task_response.status == TaskStatus.COMPLETED.value:
+            await self.response_cache.aset(request_key, {
+                'agent_reply': task_response.agent_reply,
+                'next_step': task_response.next_step,
+                'logs': task_response.logs
+            })
+    
+    def _release_task(self, task_id: str) -> Optional[str]:
+        """
+        Stop coalescing new requests onto a task: called when it finishes, and when
+        its status can't be read (error reply, network error, timeout) so the next
+        identical request creates a fresh task. Returns the task's request key.
+        """
+        request_key = self._task_keys.pop(task_id, None)
+        if request_key is None:
+            return None
+        
+        inflight = self._inflight_tasks.get(request_key)
+        if inflight is not None and inflight['task_id'] == task_id:
+            del self._inflight_tasks[request_key]
+        return request_key
+    
+    def get_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Response cache metrics, or None when caching is disabled"""
+        return self.response_cache.get_stats() if self.response_cache else None
+    
+    def get_request_stats(self) -> Dict[str, int]:
+        """Single-flight metrics"""
+        return {
+            'in_flight': len(self._inflight_tasks),
+            'coalesced_requests': self.coalesced_requests
+        }
+    
+    async def aclose(self):
+        """Close pooled connections"""
+        await self.client.aclose()
+
+class _EventLoopThread:
+    """Runs an asyncio event loop in a daemon thread so sync code can await coroutines"""
+    
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="ai-service-loop", daemon=True)
+        self.thread.start()
+    
+    def run(self, coro):
+        """Run coro on the loop and block until it returns"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+class AIServiceClient:
+    """
+    Synchronous facade over AsyncAIServiceClient for existing (Flask) callers.
+
+    All instances share one background event loop, so concurrent request threads
+    multiplex their calls over the async client's connection pool.
+    """
+    
+    _loop_thread = None
+    _loop_lock = threading.Lock()
+    
+    def __init__(self, base_url: str = None, api_key: str = None,
+                 response_cache: ResponseCache = None, circuit_breaker: CircuitBreaker = None,
+                 **pool_options):
+        self.async_client = AsyncAIServiceClient(base_url, api_key, response_cache=response_cache,
+                                                 circuit_breaker=circuit_breaker, **pool_options)
+        self.base_url = self.async_client.base_url
+        self.api_key = self.async_client.api_key
+    
+    @classmethod
+    def _get_loop_thread(cls) -> _EventLoopThread:
+        with cls._loop_lock:
+            if cls._loop_thread is None:
+                cls._loop_thread = _EventLoopThread()
+            return cls._loop_thread
+    
+    def _run(self, coro):
+        return self._get_loop_thread().run(coro)
+    
+    def create_task(self, prompt_context: str, agent_config: AgentConfig = None, 
+                   external_tool_endpoints: Dict[str, str] = None, timeout: float = None) -> str:
+        """
+        Create a new agentic task and return task_id
+        """
+        return self._run(self.async_client.create_task(prompt_context, agent_config,
+                                                       external_tool_endpoints, timeout))
+    
+    def create_tasks_batch(self, prompt_contexts: List[str], agent_config: AgentConfig = None,
+                           timeout: float = None) -> List[str]:
+        """
+        Submit several prompts in one call and return their task_ids in order
+        """
+        return self._run(self.async_client.create_tasks_batch(prompt_contexts, agent_config, timeout))
+    
+    def stream_task(self, prompt_context: str, agent_config: AgentConfig = None,
+                    timeout: float = None) -> Iterator[Dict[str, Any]]:
+        """
+        Run a task and yield its streamed events as they arrive
+        """
+        events = self.async_client.stream_task(prompt_context, agent_config, timeout)
+        
+        async def next_event():
+            return await events.__anext__()
+        
+        try:
+            while True:
+                try:
+                    yield self._run(next_event())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self._run(events.aclose())
+    
+    def get_task_status(self, task_id: str, wait: float = 0, timeout: float = None) -> TaskResponse:
+        """
+        Get current status of a task (long-polls for up to wait seconds)
+        """
+        return self._run(self.async_client.get_task_status(task_id, wait, timeout))
+    
+    def cancel_task(self, task_id: str, timeout: float = None) -> bool:
+        """
+        Cancel a running task
+        """
+        return self._run(self.async_client.cancel_task(task_id, timeout))
+    
+    def poll_task_completion(self, task_id: str, max_wait_time: int = 300, 
+                           poll_interval: int = 5, long_poll_timeout: float = 25) -> TaskResponse:
+        """
+        Wait for task completion with timeout
+        """
+        return self._run(self.async_client.poll_task_completion(task_id, max_wait_time,
+                                                                poll_interval, long_poll_timeout))
+    
+    def health_check(self, timeout: float = None) -> bool:
+        """
+        Check if AI service is available
+        """
+        return self._run(self.async_client.health_check(timeout))
+    
+    def get_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Response cache metrics, or None when caching is disabled"""
+        return self.async_client.get_cache_stats()
+    
+    def get_request_stats(self) -> Dict[str, int]:
+        """Single-flight metrics"""
+        return self.async_client.get_request_stats()
+    
+    def is_available(self) -> bool:
+        """False while the circuit breaker is open; callers should use their fallbacks"""
+        return self.async_client.is_available()
+    
+    def close(self):
+        """Close pooled connections"""
+        self._run(self.async_client.aclose())
+
+class TaskHistory:
+    """
+    Bounded record of finished tasks with O(1) lookup by task_id.
+
+    Keeps the newest max_entries tasks in memory in completion order; older ones
+    are evicted first. If spill_db_path is set, evicted entries are written to a
+    SQLite table and are still found by get().
+    """
+    
+    def __init__(self, max_entries: int = 1000, spill_db_path: str = None):
+        self.max_entries = max_entries
+        self.spill_db_path = spill_db_path
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._spill_conn = None
+        
+        if spill_db_path:
+            self._spill_conn = sqlite3.connect(spill_db_path, check_same_thread=False)
+            self._spill_conn.execute(
+                "CREATE TABLE IF NOT EXISTS task_history ("
+                "task_id TEXT PRIMARY KEY, completed_at REAL, data TEXT)"
+            )
+            self._spill_conn.commit()
+    
+    def add(self, task: Dict[str, Any]) -> None:
+        """Record a finished task, evicting (and spilling) the oldest beyond the cap"""
+        with self._lock:
+            self._entries[task['task_id']] = task
+            self._entries.move_to_end(task['task_id'])
+            
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[1])
+            
+            if evicted and self._spill_conn is not None:
+                try:
+                    self._spill_conn.executemany(
+                        "INSERT OR REPLACE INTO task_history (task_id, completed_at, data) VALUES (?, ?, ?)",
+                        [(entry['task_id'], entry.get('completed_at'), json.dumps(entry, default=str))
+                         for entry in evicted]
+                    )
+                    self._spill_conn.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Error spilling task history: {e}")
+    
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a finished task in memory, then in the spill table"""
+        with self._lock:
+            task = self._entries.get(task_id)
+            if task is not None or self._spill_conn is None:
+                return task
+            
+            row = self._spill_conn.execute(
+                "SELECT data FROM task_history WHERE task_id = ?", (task_id,)
+            ).fetchone()
+            return json.loads(row[0]) if row else None
+    
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """The newest limit tasks, oldest first"""
+        with self._lock:
+            tasks = list(self._entries.values())[-limit:] if limit > 0 else []
+            
+            missing = limit - len(tasks)
+            if missing > 0 and self._spill_conn is not None:
+                rows = self._spill_conn.execute(
+                    "SELECT data FROM task_history ORDER BY completed_at DESC LIMIT ?", (missing,)
+                ).fetchall()
+                tasks = [json.loads(row[0]) for row in reversed(rows)] + tasks
+            
+            return tasks
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, task_id: str) -> bool:
+        return self.get(task_id) is not None
 
 class TaskManager:
     """Manages task lifecycle and state"""
     
-    def __init__(self, ai_client: AIServiceClient):
+    TERMINAL_STATUSES = (TaskStatus.COMPLETED.value, TaskStatus.FAILED.value, TaskStatus.CANCELLED.value)
+    
+    def __init__(self, ai_client: AIServiceClient, max_history: int = 1000, history_db_path: str = None):
         self.ai_client = ai_client
         self.active_tasks: Dict[str, Dict[str, Any]] = {}
-        self.task_history: List[Dict[str, Any]] = []
+        self.task_history = TaskHistory(max_history, history_db_path)
+        self._lock = threading.Lock()
     
     def start_task(self, prompt_context: str, agent_config: AgentConfig = None,
                   external_tool_endpoints: Dict[str, str] = None) -> str:
@@ -222,14 +825,15 @@ class TaskManager:
         """
         task_id = self.ai_client.create_task(prompt_context, agent_config, external_tool_endpoints)
         
-        self.active_tasks[task_id] = {
-            'task_id': task_id,
-            'status': TaskStatus.PENDING.value,
-            'created_at': time.time(),
-            'prompt_context': prompt_context,
-            'agent_config': agent_config.__dict__ if agent_config else {},
-            'external_tool_endpoints': external_tool_endpoints or {}
-        }
+        with self._lock:
+            self.active_tasks[task_id] = {
+                'task_id': task_id,
+                'status': TaskStatus.PENDING.value,
+                'created_at': time.time(),
+                'prompt_context': prompt_context,
+                'agent_config': agent_config.__dict__ if agent_config else {},
+                'external_tool_endpoints': external_tool_endpoints or {}
+            }
         
         return task_id
     
@@ -238,82 +842,160 @@ class TaskManager:
         Update task status and move to history if completed
         """
         response = self.ai_client.get_task_status(task_id)
-        
-        if task_id in self.active_tasks:
-            self.active_tasks[task_id]['status'] = response.status
-            self.active_tasks[task_id]['last_updated'] = time.time()
-            
-            # Move to history if completed
-            if response.status in [TaskStatus.COMPLETED.value, TaskStatus.FAILED.value, TaskStatus.CANCELLED.value]:
-                self.active_tasks[task_id]['completed_at'] = time.time()
-                self.task_history.append(self.active_tasks[task_id])
-                del self.active_tasks[task_id]
-        
+        self._record_status(task_id, response.status)
+        return response
+    
+    def poll_task_completion(self, task_id: str, max_wait_time: int = 300) -> TaskResponse:
+        """
+        Wait for a task started with start_task and move it to history once it
+        ends, including when waiting fails or times out
+        """
+        try:
+            response = self.ai_client.poll_task_completion(task_id, max_wait_time=max_wait_time)
+        except Exception:
+            self._record_status(task_id, TaskStatus.FAILED.value)
+            raise
+        # poll_task_completion only returns early with a final status; anything else timed out
+        self._record_status(task_id, response.status if response.status in self.TERMINAL_STATUSES
+                            else TaskStatus.FAILED.value)
         return response
     
+    def _record_status(self, task_id: str, status: str) -> None:
+        """Update an active task, moving it to the bounded history once it has ended"""
+        with self._lock:
+            task = self.active_tasks.get(task_id)
+            if task is None:
+                return
+            task['status'] = status
+            task['last_updated'] = time.time()
+            if status not in self.TERMINAL_STATUSES:
+                return
+            task['completed_at'] = time.time()
+            del self.active_tasks[task_id]
+        self.task_history.add(task)
+    
     def cancel_task(self, task_id: str) -> bool:
         """
         Cancel a task
         """
         success = self.ai_client.cancel_task(task_id)
-        if success and task_id in self.active_tasks:
-            self.active_tasks[task_id]['status'] = TaskStatus.CANCELLED.value
-            self.active_tasks[task_id]['cancelled_at'] = time.time()
+        if success:
+            self._record_status(task_id, TaskStatus.CANCELLED.value)
         return success
     
     def get_task_info(self, task_id: str) -> Optional[Dict[str, Any]]:
         """
         Get task information
         """
-        if task_id in self.active_tasks:
-            return self.active_tasks[task_id]
+        with self._lock:
+            task = self.active_tasks.get(task_id)
+        if task is not None:
+            return task
         
         # Check history
-        for task in self.task_history:
-            if task['task_id'] == task_id:
-                return task
-        
-        return None
+        return self.task_history.get(task_id)
     
     def get_active_tasks(self) -> List[Dict[str, Any]]:
         """
         Get all active tasks
         """
-        return list(self.active_tasks.values())
+        with self._lock:
+            return list(self.active_tasks.values())
     
     def get_task_history(self, limit: int = 50) -> List[Dict[str, Any]]:
         """
         Get task history
         """
-        return self.task_history[-limit:]
+        return self.task_history.recent(limit)
 
 # Global instances
 ai_client = None
 task_manager = None
+_init_lock = threading.Lock()
+
+# Cached result of the background health monitor
+ai_service_health: Dict[str, Any] = {'healthy': None, 'checked_at': None, 'latency': None}
+_warmup_thread = None
 
 def initialize_ai_service(base_url: str = None, api_key: str = None):
     """Initialize AI service client and task manager"""
     global ai_client, task_manager
     
-    ai_client = AIServiceClient(base_url, api_key)
-    task_manager = TaskManager(ai_client)
+    config = get_ai_config()
+    history_config = config['task_history']
+    breaker_config = config['circuit_breaker']
+    circuit_breaker = None
+    if breaker_config['enabled']:
+        circuit_breaker = CircuitBreaker(
+            failure_threshold=breaker_config['failure_threshold'],
+            window=breaker_config['window'],
+            latency_threshold=breaker_config['latency_threshold'],
+            recovery_timeout=breaker_config['recovery_timeout']
+        )
+    ai_client = AIServiceClient(base_url, api_key,
+                                response_cache=create_response_cache(config['response_cache']),
+                                circuit_breaker=circuit_breaker)
+    task_manager = TaskManager(ai_client,
+                               max_history=history_config['max_entries'],
+                               history_db_path=history_config['spill_db_path'])
     
     logger.info(f"AI Service initialized with base URL: {ai_client.base_url}")
-    
-    # Test connection
-    if ai_client.health_check():
-        logger.info("AI Service health check passed")
-    else:
-        logger.warning("AI Service health check failed - service may be unavailable")
+
+def _ensure_initialized():
+    if ai_client is None:
+        with _init_lock:
+            if ai_client is None:
+                initialize_ai_service()
 
 def get_ai_client() -> AIServiceClient:
     """Get the global AI client instance"""
-    if ai_client is None:
-        initialize_ai_service()
+    _ensure_initialized()
     return ai_client
 
 def get_task_manager() -> TaskManager:
     """Get the global task manager instance"""
-    if task_manager is None:
-        initialize_ai_service()
+    _ensure_initialized()
     return task_manager
+
+def refresh_ai_service_health() -> Dict[str, Any]:
+    """Run a health check now and update the cached health state"""
+    client = get_ai_client()
+    start_time = time.time()
+    healthy = client.health_check()
+    
+    if healthy != ai_service_health['healthy']:
+        if healthy:
+            logger.info("AI Service health check passed")
+        else:
+            logger.warning("AI Service health check failed - service may be unavailable")
+    
+    ai_service_health.update(healthy=healthy, checked_at=time.time(), latency=time.time() - start_time)
+    return get_ai_service_health()
+
+def get_ai_service_health() -> Dict[str, Any]:
+    """Cached health state; never makes a network call"""
+    return dict(ai_service_health)
+
+def _health_monitor(interval: float):
+    while True:
+        try:
+            refresh_ai_service_health()
+        except Exception as e:
+            logger.error(f"AI Service health monitor error: {e}")
+        time.sleep(interval)
+
+def start_ai_service_warmup(interval: float = None) -> threading.Thread:
+    """
+    Build the client and open its connection pool in a background thread, then
+    keep re-checking health every interval seconds. Safe to call more than once.
+    """
+    global _warmup_thread
+    
+    with _init_lock:
+        if _warmup_thread is None or not _warmup_thread.is_alive():
+            if interval is None:
+                interval = get_ai_config()['health_check_interval']
+            _warmup_thread = threading.Thread(target=_health_monitor, args=(interval,),
+                                              name="ai-service-warmup", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
@@ -32,6 +32,34 @@ AI_SERVICE_CONFIG = {
         'max_wait_time': 300  # 5 minutes
     },
     
+    # Seconds between background health checks of the service
+    'health_check_interval': int(os.environ.get('AI_HEALTH_CHECK_INTERVAL', 60)),
+    
+    # Finished-task history kept by the client's TaskManager
+    'task_history': {
+        'max_entries': int(os.environ.get('AI_TASK_HISTORY_LIMIT', 1000)),
+        # SQLite file that evicted entries spill to (disabled when unset)
+        'spill_db_path': os.environ.get('AI_TASK_HISTORY_DB')
+    },
+    
+    # Cache of completed responses for identical prompts and settings
+    'response_cache': {
+        'backend': os.environ.get('AI_CACHE_BACKEND', 'memory'),  # memory, sqlite, redis or none
+        'ttl': int(os.environ.get('AI_CACHE_TTL', 3600)),  # seconds
+        'max_entries': int(os.environ.get('AI_CACHE_MAX_ENTRIES', 1000)),
+        'sqlite_path': os.environ.get('AI_CACHE_DB', 'ai_response_cache.db'),
+        'redis_url': os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    },
+    
+    # Fail fast to template fallbacks while the service is down or slow
+    'circuit_breaker': {
+        'enabled': os.environ.get('AI_CIRCUIT_BREAKER', 'true').lower() == 'true',
+        'failure_threshold': 5,  # failures within the window that open the circuit
+        'window': 60,  # seconds
+        'latency_threshold': 20,  # seconds; slower calls count as failures
+        'recovery_timeout': 30  # seconds between background probes
+    },
+    
     # Model-specific configurations
     'model_configs': {
         'flan-t5-small': {
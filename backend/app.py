@@ -2,7 +2,7 @@
 Flask Web Interface for Agentic Engineering Notebook Writer
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, make_response, send_file
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, make_response, send_file, Response, stream_with_context
 from flask_cors import CORS
 import os
 import json
@@ -19,6 +19,8 @@ load_dotenv()
 from en_writer import ENWriter
 from database_manager import SmartNotebookerDB
 from auth import AuthManager
+from job_queue import JobQueue, JOB_COMPLETED, JOB_FAILED
+from ai_service_client import start_ai_service_warmup, get_ai_service_health, get_ai_client
 # Removed external AI service dependency
 
 # Import livereload for development
@@ -97,6 +99,10 @@ if LIVERELOAD_AVAILABLE and app.debug:
 en_writer = None
 db = None
 auth = None
+job_queue = JobQueue(max_workers=int(os.environ.get('JOB_WORKERS', 4)))
+
+# Connect to the AI service and monitor its health off the request path
+start_ai_service_warmup()
 
 def initialize_en_writer():
     """Initialize the EN Writer with default directory"""
@@ -115,7 +121,7 @@ def initialize_en_writer():
 def generate_ai_response(message: str, context: str = "") -> str:
     """Generate AI response using simple logic (replace with your AI service)"""
     try:
-        logger.info(f"🤖 Generating AI response", message_length=len(message), context_length=len(context))
+        logger.info(f"🤖 Generating AI response - message length: {len(message)}, context length: {len(context)}")
         
         # Simple response generation - replace with OpenAI, Anthropic, or local model
         if "help" in message.lower():
@@ -425,9 +431,10 @@ def health_check():
             "timestamp": datetime.now().isoformat(),
             "database": "connected" if db else "not_initialized",
             "ai_service": "available" if en_writer else "not_initialized",
-            "auth": "available" if auth else "not_initialized"
+            "auth": "available" if auth else "not_initialized",
+            "ai_backend": get_ai_service_health()
         }
-        logger.info("✅ Health check completed", status=health_status["status"])
+        logger.info(f"✅ Health check completed - status: {health_status['status']}")
         return health_status, 200
     except Exception as e:
         logger.error(f"❌ Health check failed: {e}")
@@ -485,6 +492,122 @@ def analyze():
         logger.error(f"Error in analyze route: {e}")
         return f"Error: {str(e)}", 500
 
+@app.route('/api/analyze/stream')
+def analyze_stream():
+    """Stream per-section gap findings as NDJSON (default) or SSE (?format=sse)"""
+    if not en_writer:
+        initialize_en_writer()
+    
+    project_id = request.args.get('project_id', type=int)
+    if project_id is not None:
+        user_id = session.get('user_id')
+        if not user_id:
+            return jsonify({'status': 'error', 'message': 'Authentication required'}), 401
+        project = db.get_project_by_id(project_id) if hasattr(db, 'get_project_by_id') else None
+        # Same response for someone else's project as for a missing one
+        if not project or project.get('user_id') != user_id:
+            return jsonify({'status': 'error', 'message': 'Project not found'}), 404
+        project_en_files = db.get_project_en_files(project_id) if hasattr(db, 'get_project_en_files') else []
+        sections = (
+            (en_file.get('filename') or en_file.get('title') or str(en_file.get('id')), en_file.get('content') or '')
+            for en_file in project_en_files
+        )
+        scope = f"project:{project_id}"
+    else:
+        # Load sections if not already loaded
+        if not en_writer.sections:
+            en_writer.load_en_sections("en_files")
+        sections = list(en_writer.sections.items())
+        scope = "default"
+    
+    use_sse = request.args.get('format') == 'sse' or 'text/event-stream' in request.headers.get('Accept', '')
+    
+    def generate():
+        try:
+            for finding in en_writer.iter_section_gaps(sections, scope=scope):
+                if use_sse:
+                    event = 'summary' if 'missing_sections' in finding else 'section'
+                    yield f"event: {event}\ndata: {json.dumps(finding)}\n\n"
+                else:
+                    yield json.dumps(finding) + "\n"
+        except Exception as e:
+            logger.error(f"Error in analyze stream: {e}")
+            error = {'error': str(e)}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n" if use_sse else json.dumps(error) + "\n"
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream' if use_sse else 'application/x-ndjson'
+    )
+    # Let proxies pass chunks through as they are produced
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def run_draft_job(section_name: str, user_inputs: dict) -> dict:
+    """Background job: generate, save and log a new draft"""
+    # Generate draft using LLM
+    draft_content = en_writer.draft_new_entry(section_name, user_inputs)
+    
+    # Save the draft
+    en_writer.sections[section_name] = draft_content
+    en_writer.save_en_files({section_name: draft_content})
+    
+    # Log activity
+    en_writer.log_agent_activity(
+        "activity_log.json",
+        {
+            'action': 'draft_created',
+            'section': section_name,
+            'user_inputs': user_inputs
+        }
+    )
+    return {'section_name': section_name, 'content': draft_content}
+
+def run_rewrite_job(section_name: str, improvement_focus: str) -> dict:
+    """Background job: rewrite, save and log an existing section"""
+    original_content = en_writer.sections[section_name]
+    
+    # Rewrite using LLM
+    improved_content = en_writer.rewrite_entry(original_content)
+    
+    # Save the improved version
+    en_writer.sections[section_name] = improved_content
+    en_writer.save_en_files({section_name: improved_content})
+    
+    # Log activity
+    en_writer.log_agent_activity(
+        "activity_log.json",
+        {
+            'action': 'section_rewritten',
+            'section': section_name,
+            'improvement_focus': improvement_focus
+        }
+    )
+    return {'section_name': section_name, 'content': improved_content}
+
+def draft_inputs_from_form(form, section_name: str) -> dict:
+    """Collect draft user inputs from a form or JSON body"""
+    return {
+        'title': form.get('title', section_name),
+        'overview': form.get('overview', ''),
+        'technical_details': form.get('technical_details', ''),
+        'implementation': form.get('implementation', ''),
+        'testing': form.get('testing', ''),
+        'results': form.get('results', ''),
+        'improvements': form.get('improvements', ''),
+        'tags': form.get('tags', 'robotics, engineering'),
+        'comment': form.get('comment', '')
+    }
+
+def job_accepted_response(job_id: str):
+    """202 response pointing at the job status and result endpoints"""
+    return jsonify({
+        'status': 'accepted',
+        'job_id': job_id,
+        'status_url': url_for('job_status', job_id=job_id),
+        'result_url': url_for('job_result', job_id=job_id)
+    }), 202
+
 @app.route('/draft', methods=['GET', 'POST'])
 def draft():
     """Draft new section"""
@@ -493,36 +616,12 @@ def draft():
     
     if request.method == 'POST':
         section_name = request.form.get('section_name')
-        user_inputs = {
-            'title': request.form.get('title', section_name),
-            'overview': request.form.get('overview', ''),
-            'technical_details': request.form.get('technical_details', ''),
-            'implementation': request.form.get('implementation', ''),
-            'testing': request.form.get('testing', ''),
-            'results': request.form.get('results', ''),
-            'improvements': request.form.get('improvements', ''),
-            'tags': request.form.get('tags', 'robotics, engineering'),
-            'comment': request.form.get('comment', '')
-        }
-        
-        # Generate draft using LLM
-        draft_content = en_writer.draft_new_entry(section_name, user_inputs)
+        user_inputs = draft_inputs_from_form(request.form, section_name)
         
-        # Save the draft
-        en_writer.sections[section_name] = draft_content
-        en_writer.save_en_files({section_name: draft_content})
+        # Generation runs in the background; the page doesn't wait on the AI service
+        job_id = job_queue.submit('draft', run_draft_job, section_name, user_inputs)
         
-        # Log activity
-        en_writer.log_agent_activity(
-            "activity_log.json",
-            {
-                'action': 'draft_created',
-                'section': section_name,
-                'user_inputs': user_inputs
-            }
-        )
-        
-        flash(f'Draft created for section: {section_name}', 'success')
+        flash(f'Draft generation started for section: {section_name} (job {job_id})', 'success')
         return redirect(url_for('sections'))
     
     return render_template('draft.html')
@@ -539,26 +638,11 @@ def rewrite(section_name):
     
     if request.method == 'POST':
         improvement_focus = request.form.get('improvement_focus', 'clarity and technical rigor')
-        original_content = en_writer.sections[section_name]
-        
-        # Rewrite using LLM
-        improved_content = en_writer.rewrite_entry(original_content)
         
-        # Save the improved version
-        en_writer.sections[section_name] = improved_content
-        en_writer.save_en_files({section_name: improved_content})
-        
-        # Log activity
-        en_writer.log_agent_activity(
-            "activity_log.json",
-            {
-                'action': 'section_rewritten',
-                'section': section_name,
-                'improvement_focus': improvement_focus
-            }
-        )
+        # Rewrite runs in the background; the page doesn't wait on the AI service
+        job_id = job_queue.submit('rewrite', run_rewrite_job, section_name, improvement_focus)
         
-        flash(f'Section {section_name} has been improved', 'success')
+        flash(f'Rewrite started for section {section_name} (job {job_id})', 'success')
         return redirect(url_for('sections'))
     
     section_content = en_writer.sections[section_name]
@@ -566,6 +650,56 @@ def rewrite(section_name):
                          section_name=section_name, 
                          section_content=section_content)
 
+@app.route('/api/jobs/draft', methods=['POST'])
+def submit_draft_job():
+    """Queue a draft generation job; returns a job id immediately"""
+    if not en_writer:
+        initialize_en_writer()
+    
+    data = request.get_json(silent=True) or request.form
+    section_name = data.get('section_name')
+    if not section_name:
+        return jsonify({'status': 'error', 'message': 'section_name is required'}), 400
+    
+    job_id = job_queue.submit('draft', run_draft_job, section_name, draft_inputs_from_form(data, section_name))
+    return job_accepted_response(job_id)
+
+@app.route('/api/jobs/rewrite/<section_name>', methods=['POST'])
+def submit_rewrite_job(section_name):
+    """Queue a rewrite job for an existing section; returns a job id immediately"""
+    if not en_writer:
+        initialize_en_writer()
+    
+    if section_name not in en_writer.sections:
+        return jsonify({'status': 'error', 'message': f'Section {section_name} not found'}), 404
+    
+    data = request.get_json(silent=True) or request.form
+    improvement_focus = data.get('improvement_focus', 'clarity and technical rigor')
+    
+    job_id = job_queue.submit('rewrite', run_rewrite_job, section_name, improvement_focus)
+    return job_accepted_response(job_id)
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Status of a background job"""
+    job = job_queue.get_job(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Result of a finished job: 200 when completed, 202 while pending, 500 if it failed"""
+    job = job_queue.get_job(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    
+    if job['status'] == JOB_COMPLETED:
+        return jsonify({'status': JOB_COMPLETED, 'job_id': job_id, 'result': job_queue.get_result(job_id)})
+    if job['status'] == JOB_FAILED:
+        return jsonify({'status': JOB_FAILED, 'job_id': job_id, 'error': job['error']}), 500
+    return jsonify({'status': job['status'], 'job_id': job_id}), 202
+
 @app.route('/section/<section_name>')
 def view_section(section_name):
     """View specific section"""
@@ -786,7 +920,7 @@ def create_backup():
         backup_data = {
             'sections': en_writer.sections,
             'planning_data': en_writer.planning_data,
-            'activity_log': en_writer.activity_log,
+            'activity_log': list(en_writer.activity_log),
             'timestamp': timestamp
         }
         
@@ -870,10 +1004,14 @@ def project_analyze(project_id):
         return redirect(url_for('dashboard'))
     
     # Get project sections for analysis
-    project_sections = db.get_project_en_files(project_id) if hasattr(db, 'get_project_en_files') else []
+    project_en_files = db.get_project_en_files(project_id) if hasattr(db, 'get_project_en_files') else []
+    project_sections = {
+        en_file.get('filename') or en_file.get('title') or str(en_file.get('id')): en_file.get('content') or ''
+        for en_file in project_en_files
+    }
     
-    # Run gap analysis on project sections
-    gap_analysis = en_writer.analyze_sections_for_gaps(project_sections)
+    # Run gap analysis on project sections (cached per project, only changed sections are re-analyzed)
+    gap_analysis = en_writer.analyze_sections_for_gaps(project_sections, scope=f"project:{project_id}")
     questions = en_writer.generate_user_questions(gap_analysis)
     
     return render_template('project_analyze.html', 
@@ -971,13 +1109,13 @@ def ai_chat():
         project_id = data.get('projectId', '')
         context = data.get('context', '')
         
-        logger.info(f"📝 AI Chat request received", project_id=project_id, message_length=len(message), context_length=len(context))
+        logger.info(f"📝 AI Chat request received - project: {project_id}, message length: {len(message)}, context length: {len(context)}")
         
         if not message:
             logger.error("❌ Message is required")
             return jsonify({'success': False, 'error': 'Message is required'}), 400
         
-        logger.info(f"🧠 Processing AI Chat request", project_id=project_id, message_preview=message[:100])
+        logger.info(f"🧠 Processing AI Chat request - project: {project_id}, message: {message[:100]}")
         
         # Create prompt context for AI service
         prompt_context = f"""
@@ -991,6 +1129,9 @@ def ai_chat():
         Be specific and actionable in your response.
         """
         
+        if data.get('stream'):
+            return stream_ai_chat(prompt_context, message, context)
+        
         logger.info("🔧 Generating AI response...")
         # Simple AI response generation (replace with your preferred AI service)
         # For now, using a simple response generator
@@ -1026,6 +1167,30 @@ def ai_chat():
             'error': 'Internal server error'
         }), 500
 
+def stream_ai_chat(prompt_context: str, message: str, context: str):
+    """Proxy the AI service's token stream to the browser as Server-Sent Events"""
+    def generate():
+        streamed = False
+        try:
+            for event in get_ai_client().stream_task(prompt_context):
+                streamed = True
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+        except Exception as e:
+            logger.error(f"❌ Error streaming AI chat: {e}")
+            if streamed:
+                yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+                return
+            # Nothing was sent yet, so answer with the local response instead
+            fallback = generate_ai_response(message, context)
+            yield f"event: token\ndata: {json.dumps({'text': fallback})}\n\n"
+            yield f"event: done\ndata: {json.dumps({'status': 'completed', 'agent_reply': fallback})}\n\n"
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Let proxies pass chunks through as they are produced
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/api/ai/analyze', methods=['POST'])
 @require_api_key
 def ai_analyze():
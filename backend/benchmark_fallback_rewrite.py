@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""
+Microbenchmark for the fallback rewrite pipeline (ENWriter._generate_fallback_rewrite)
+
+Compares the precompiled two-pass pipeline against the original
+one-substitution-per-pattern implementation on 1 KB, 100 KB and 1 MB entries,
+and checks both produce identical output.
+
+Usage: python benchmark_fallback_rewrite.py [--repeat 5]
+"""
+
+import argparse
+import logging
+import random
+import re
+import time
+
+from en_writer import ENWriter
+
+SIZES = [('1 KB', 1024), ('100 KB', 100 * 1024), ('1 MB', 1024 * 1024)]
+
+WORDS = [
+    'the', 'sensor', 'was', 'calibrated', 'TODO', 'implement', 'testing',
+    'results', 'improve', 'TBD', 'FIXME', 'motor', 'torque', 'encoder', 'and',
+    'PID', 'loop', 'XXX', 'wait...then', 'Implementation', 'feedback'
+]
+
+
+def legacy_fallback_rewrite(entry_text: str) -> str:
+    """Original fallback rewrite: about ten uncached regex passes plus repeated scans"""
+    improved_text = re.sub(r'\n\s*\n\s*\n', '\n\n', entry_text)
+    improved_text = re.sub(r'([.!?])\s*([A-Z])', r'\1\n\n\2', improved_text)
+
+    enhancements = {
+        r'\bTODO\b': '**TODO:**',
+        r'\bFIXME\b': '**FIXME:**',
+        r'\bTBD\b': '**To Be Determined:**',
+        r'\bXXX\b': '**Note:**',
+        r'\b\.\.\.\b': '**[Additional details to be added]**',
+        r'\b(?:implement|implementation)\b': '**Implementation:**',
+        r'\b(?:test|testing)\b': '**Testing:**',
+        r'\b(?:result|results)\b': '**Results:**',
+        r'\b(?:improve|improvement)\b': '**Improvements:**'
+    }
+    for pattern, replacement in enhancements.items():
+        improved_text = re.sub(pattern, replacement, improved_text, flags=re.IGNORECASE)
+
+    if not improved_text.startswith('#'):
+        first_line = improved_text.split('\n')[0]
+        improved_text = f"# {first_line}\n\n{improved_text}"
+    for section in ['Overview', 'Technical Details', 'Implementation', 'Testing', 'Results', 'Improvements']:
+        if f"## {section}" not in improved_text and f"# {section}" not in improved_text:
+            improved_text += f"\n\n## {section}\n[Content to be added]"
+
+    if len(improved_text.strip()) < 200:
+        improved_text += "\\n\\n**[Technical Note:]** This section requires additional technical details, specifications, and implementation information to meet engineering documentation standards."
+    if 'improvement' not in improved_text.lower() and 'future' not in improved_text.lower():
+        improved_text += "\\n\\n## Future Improvements\\n[Future enhancements and optimizations to be documented]"
+
+    return improved_text
+
+
+def generate_entry(size: int, seed: int = 7) -> str:
+    """Build a synthetic EN entry of roughly size characters"""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size:
+        sentence = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 18)))
+        sentence = sentence[0].upper() + sentence[1:] + rng.choice(['. ', '! ', '? ', '.\n\n\n', '.\n'])
+        parts.append(sentence)
+        length += len(sentence)
+    return ''.join(parts)[:size]
+
+
+def best_of(func, text: str, repeat: int) -> float:
+    """Best wall time of repeat runs"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    writer = ENWriter('.')
+
+    print(f"{'size':<10}{'legacy ms':>12}{'fused ms':>12}{'speedup':>10}")
+    for label, size in SIZES:
+        text = generate_entry(size)
+        assert writer._generate_fallback_rewrite(text) == legacy_fallback_rewrite(text), \
+            f"Output mismatch at {label}"
+
+        legacy_time = best_of(legacy_fallback_rewrite, text, args.repeat)
+        fused_time = best_of(writer._generate_fallback_rewrite, text, args.repeat)
+        print(f"{label:<10}{legacy_time * 1000:>12.2f}{fused_time * 1000:>12.2f}"
+              f"{legacy_time / fused_time:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Benchmark for the FLAN-T5 inference backends (settings.INFERENCE_BACKEND) on CPU
+
+Runs each backend (pytorch, pytorch-int8, onnx) in its own subprocess so peak
+RSS is measured per backend, generates greedily from the same prompts, and
+reports load time, generated tokens/sec and peak RSS. The first output of each
+backend is printed to eyeball quantization quality.
+
+Usage: python benchmark_inference_backends.py [--backends pytorch onnx] [--max-new-tokens 128] [--repeat 3]
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+RESULT_PREFIX = 'RESULT '
+
+PROMPTS = [
+    "Summarize the calibration procedure for a six-axis force sensor in numbered steps.",
+    "Explain why a PID motor controller might oscillate and how to tune it.",
+    "Write a short test plan for verifying encoder accuracy on a robotic arm joint.",
+    "List the risks of running a lithium battery pack above its rated discharge current.",
+    "Rewrite as a clear lab notebook entry: motor torque low, swapped driver, torque ok now, need retest at 24V."
+]
+
+
+def run_worker(backend: str, max_new_tokens: int, repeat: int) -> dict:
+    """Load one backend and time generation; runs inside the subprocess"""
+    import torch
+    from transformers import AutoTokenizer
+
+    from config.settings import settings
+    from models.llama_agent import load_model
+
+    start = time.perf_counter()
+    tokenizer = AutoTokenizer.from_pretrained(settings.MODEL_NAME, cache_dir=settings.MODEL_CACHE_DIR)
+    model, used_backend = load_model(backend)
+    load_time = time.perf_counter() - start
+
+    encoded = [tokenizer(prompt, return_tensors="pt", truncation=True, max_length=512) for prompt in PROMPTS]
+    with torch.no_grad():
+        # Warm-up: first call includes lazy initialization (ONNX session, quantized kernels)
+        sample = tokenizer.decode(model.generate(**encoded[0], max_new_tokens=max_new_tokens, do_sample=False)[0],
+                                  skip_special_tokens=True)
+
+        generated_tokens = 0
+        elapsed = 0.0
+        for _ in range(repeat):
+            for inputs in encoded:
+                call_start = time.perf_counter()
+                output = model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False)
+                elapsed += time.perf_counter() - call_start
+                generated_tokens += output.shape[1] - 1  # minus the decoder start token
+
+    return {
+        'backend': used_backend,
+        'load_s': load_time,
+        'tokens': generated_tokens,
+        'tokens_per_s': generated_tokens / elapsed if elapsed else 0.0,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'sample': sample
+    }
+
+
+def run_backend(backend: str, max_new_tokens: int, repeat: int) -> dict:
+    """Run one backend in a fresh interpreter and parse its result line"""
+    completed = subprocess.run(
+        [sys.executable, __file__, '--worker', backend,
+         '--max-new-tokens', str(max_new_tokens), '--repeat', str(repeat)],
+        capture_output=True, text=True
+    )
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"{backend} benchmark failed:\n{completed.stderr[-2000:]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', default=['pytorch', 'pytorch-int8', 'onnx'])
+    parser.add_argument('--max-new-tokens', type=int, default=128)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(RESULT_PREFIX + json.dumps(run_worker(args.worker, args.max_new_tokens, args.repeat)))
+        return
+
+    results = []
+    print(f"{'backend':<14}{'used':<14}{'load s':>8}{'tokens':>8}{'tok/s':>10}{'peak RSS MB':>13}")
+    for backend in args.backends:
+        result = run_backend(backend, args.max_new_tokens, args.repeat)
+        results.append((backend, result))
+        print(f"{backend:<14}{result['backend']:<14}{result['load_s']:>8.1f}{result['tokens']:>8}"
+              f"{result['tokens_per_s']:>10.1f}{result['peak_rss_mb']:>13.0f}")
+
+    print()
+    for backend, result in results:
+        print(f"[{backend}] {result['sample'][:200]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Benchmark for EN section ingestion: serial vs thread pool vs process pool
+
+Usage: python benchmark_section_loading.py [--sections 10000] [--workers 4]
+"""
+
+import argparse
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from en_writer import ENWriter
+
+WORDS = [
+    'sensor', 'actuator', 'servo', 'encoder', 'chassis', 'drivetrain', 'PID',
+    'controller', 'calibration', 'torque', 'battery', 'voltage', 'the', 'and',
+    'was', 'tested', 'with', 'using', 'maybe', 'diagram', 'TODO', 'results'
+]
+
+
+def generate_sections(target_dir: str, count: int, seed: int = 42) -> None:
+    """Write count synthetic EN files of roughly 2-6 KB each"""
+    rng = random.Random(seed)
+    for i in range(count):
+        paragraphs = []
+        for _ in range(rng.randint(4, 12)):
+            paragraphs.append(' '.join(rng.choice(WORDS) for _ in range(rng.randint(40, 90))) + '.')
+        body = '\n\n'.join(paragraphs)
+        text = (
+            f"# Section {i}\n\n{body}\n\n"
+            f"[image {i % 7 + 1}] - Figure for section {i}\n"
+            f"[TAG: robotics, section-{i % 50}]\n"
+            f"[COMMENT: synthetic benchmark entry {i}]\n"
+        )
+        with open(os.path.join(target_dir, f"section_{i:05d}.txt"), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+def time_load(en_dir: str, workers: int, executor: str) -> tuple:
+    """Cold-load en_dir with a fresh ENWriter and return (seconds, sections)"""
+    writer = ENWriter(en_dir)
+    start = time.perf_counter()
+    sections = writer.load_en_sections(en_dir, workers=workers, executor=executor)
+    return time.perf_counter() - start, sections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sections', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    en_dir = tempfile.mkdtemp(prefix='en_bench_')
+    try:
+        print(f"Generating {args.sections} synthetic sections in {en_dir}...")
+        generate_sections(en_dir, args.sections)
+
+        # Warm the OS page cache so every run measures parsing, not the first disk read
+        time_load(en_dir, 0, 'process')
+
+        baseline_time, baseline = time_load(en_dir, 0, 'process')
+        print(f"{'mode':<22}{'seconds':>10}{'speedup':>10}")
+        print(f"{'serial':<22}{baseline_time:>10.3f}{1.0:>10.2f}")
+
+        for executor in ('thread', 'process'):
+            elapsed, sections = time_load(en_dir, args.workers, executor)
+            assert sections == baseline, f"{executor} pool returned different sections"
+            label = f"{executor} x{args.workers}"
+            print(f"{label:<22}{elapsed:>10.3f}{baseline_time / elapsed:>10.2f}")
+
+        writer = ENWriter(en_dir)
+        writer.load_en_sections(en_dir)
+        start = time.perf_counter()
+        writer.load_en_sections(en_dir)
+        print(f"{'warm index reload':<22}{time.perf_counter() - start:>10.3f}")
+    finally:
+        shutil.rmtree(en_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Circuit Breaker for the AI Automation Service
+Fails fast while the service is down or too slow, and probes it in the background
+"""
+
+import time
+import threading
+import logging
+from collections import deque
+from typing import Callable, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the service while the circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Counts failed and slow calls in a sliding window.
+
+    Once failure_threshold of them happen within window seconds the circuit opens
+    and allow_request() returns False. A background thread then calls probe()
+    every recovery_timeout seconds (half-open); the first successful probe closes
+    the circuit again. User requests never act as the probe.
+    """
+
+    def __init__(self, failure_threshold: int = 5, window: float = 60.0,
+                 latency_threshold: float = 20.0, recovery_timeout: float = 30.0,
+                 probe: Callable[[], bool] = None):
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.latency_threshold = latency_threshold
+        self.recovery_timeout = recovery_timeout
+        self.probe = probe
+
+        self.state = STATE_CLOSED
+        self.opened_at: Optional[float] = None
+        self._failures = deque()
+        self._lock = threading.Lock()
+        self._probe_thread = None
+
+        self.total_calls = 0
+        self.total_failures = 0
+        self.rejected_calls = 0
+        self.times_opened = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != STATE_CLOSED
+
+    def allow_request(self) -> bool:
+        """Whether a call to the service may be made now"""
+        if self.state == STATE_CLOSED:
+            return True
+        with self._lock:
+            self.rejected_calls += 1
+        return False
+
+    def record_success(self, latency: float = None) -> None:
+        """Record a completed call; calls slower than latency_threshold count as failures"""
+        if latency is not None and latency > self.latency_threshold:
+            logger.warning(f"AI service call took {latency:.1f}s (threshold {self.latency_threshold}s)")
+            self.record_failure()
+            return
+        with self._lock:
+            self.total_calls += 1
+
+    def record_failure(self) -> None:
+        """Record a failed call and open the circuit if the window threshold is reached"""
+        now = time.time()
+        with self._lock:
+            self.total_calls += 1
+            self.total_failures += 1
+            self._failures.append(now)
+            while self._failures and now - self._failures[0] > self.window:
+                self._failures.popleft()
+
+            if self.state == STATE_CLOSED and len(self._failures) >= self.failure_threshold:
+                self._open()
+
+    def _open(self) -> None:
+        """Open the circuit and start the background prober (lock held)"""
+        self.state = STATE_OPEN
+        self.opened_at = time.time()
+        self.times_opened += 1
+        logger.warning(f"AI service circuit opened after {len(self._failures)} failures "
+                       f"in {self.window:.0f}s; using fallbacks")
+
+        if self._probe_thread is None or not self._probe_thread.is_alive():
+            self._probe_thread = threading.Thread(target=self._probe_loop, name="ai-circuit-probe", daemon=True)
+            self._probe_thread.start()
+
+    def _probe_loop(self) -> None:
+        """Half-open probing until the service answers"""
+        while True:
+            time.sleep(self.recovery_timeout)
+            with self._lock:
+                self.state = STATE_HALF_OPEN
+
+            try:
+                healthy = bool(self.probe()) if self.probe else True
+            except Exception as e:
+                logger.debug(f"AI service probe failed: {e}")
+                healthy = False
+
+            with self._lock:
+                if healthy:
+                    self.state = STATE_CLOSED
+                    self.opened_at = None
+                    self._failures.clear()
+                    logger.info("AI service probe succeeded; circuit closed")
+                    return
+                self.state = STATE_OPEN
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Breaker state and counters"""
+        with self._lock:
+            return {
+                'state': self.state,
+                'opened_at': self.opened_at,
+                'recent_failures': len(self._failures),
+                'total_calls': self.total_calls,
+                'total_failures': self.total_failures,
+                'rejected_calls': self.rejected_calls,
+                'times_opened': self.times_opened
+            }
@@ -26,11 +26,26 @@ class Settings(BaseSettings):
     MODEL_NAME: str = Field(default="google/flan-t5-small", env="MODEL_NAME")
     MODEL_CACHE_DIR: str = Field(default="./model_cache", env="MODEL_CACHE_DIR")
     MAX_CONCURRENT_TASKS: int = Field(default=10, env="MAX_CONCURRENT_TASKS")
+    MAX_BATCH_SIZE: int = Field(default=16, env="MAX_BATCH_SIZE")  # tasks per /agentic-task/batch call
+    
+    # Inference micro-batching settings
+    INFERENCE_BATCHING: bool = Field(default=True, env="INFERENCE_BATCHING")
+    INFERENCE_MAX_BATCH_SIZE: int = Field(default=8, env="INFERENCE_MAX_BATCH_SIZE")
+    INFERENCE_BATCH_WINDOW_MS: float = Field(default=10.0, env="INFERENCE_BATCH_WINDOW_MS")
+    INFERENCE_CONCURRENT_BATCHES: int = Field(default=2, env="INFERENCE_CONCURRENT_BATCHES")  # concurrent generations (all paths) when batching
+    INFERENCE_THREADS: int = Field(default=0, env="INFERENCE_THREADS")  # torch intra-op threads, 0 = cores / parallel generations
+    INFERENCE_BACKEND: str = Field(default="pytorch", env="INFERENCE_BACKEND")  # pytorch, pytorch-int8 or onnx
+    ONNX_MODEL_DIR: str = Field(default="./model_cache/onnx", env="ONNX_MODEL_DIR")  # exported ONNX models
+    
+    # Generation pipeline: "single", "reason+summarize" or "summarize-only-if-long"
+    PIPELINE_MODE: str = Field(default="reason+summarize", env="PIPELINE_MODE")
+    SUMMARIZE_MIN_TOKENS: int = Field(default=256, env="SUMMARIZE_MIN_TOKENS")  # for summarize-only-if-long
     
     # Task management settings
     TASK_TIMEOUT: int = Field(default=300, env="TASK_TIMEOUT")  # 5 minutes
     TASK_CLEANUP_INTERVAL: int = Field(default=3600, env="TASK_CLEANUP_INTERVAL")  # 1 hour
     MAX_TASK_HISTORY: int = Field(default=1000, env="MAX_TASK_HISTORY")
+    LONG_POLL_MAX_WAIT: float = Field(default=30.0, env="LONG_POLL_MAX_WAIT")  # seconds
     
     # Redis settings (for task state management)
     REDIS_URL: str = Field(default="redis://localhost:6379/0", env="REDIS_URL")
@@ -6,28 +6,378 @@ A modular system for managing and improving engineering documentation
 import os
 import json
 import re
+import hashlib
+import atexit
+import weakref
+import tempfile
+import threading
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Iterable, Iterator, Union
 from pathlib import Path
+from dataclasses import dataclass, field
+from functools import cached_property
 import logging
 
+from keyword_matcher import KeywordMatcher
+from activity_log import ActivityLogWriter
+
 # Import AI service client
-from ai_service_client import get_ai_client, get_task_manager, AgentConfig, TaskStatus
+from ai_service_client import get_task_manager, AgentConfig, TaskStatus
+from circuit_breaker import CircuitOpenError
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Indicator words per gap category, matched case-insensitively
+DEFAULT_GAP_INDICATORS = {
+    # Placeholder text or incomplete technical details
+    'technical_gaps': ['TODO', 'TBD', 'FIXME', 'XXX', '...'],
+    # Simple heuristics for unclear content
+    'unclear_content': [
+        'unclear', 'confusing', 'needs clarification', 'not sure',
+        'maybe', 'possibly', 'might be', 'could be'
+    ],
+    # Technical descriptions that typically need diagrams
+    'missing_images': [
+        'diagram', 'schematic', 'flowchart', 'architecture',
+        'circuit', 'mechanical design', 'assembly', 'layout'
+    ]
+}
+
+# Expected sections for a robotics EN
+EXPECTED_SECTIONS = [
+    'system_overview', 'hardware_design', 'software_architecture',
+    'control_systems', 'sensors', 'actuators', 'testing_procedures',
+    'results_analysis', 'future_improvements', 'references'
+]
+
+# Gap report categories decided per section (missing_sections is decided per notebook)
+SECTION_GAP_CATEGORIES = ('incomplete_sections', 'unclear_content', 'missing_images', 'technical_gaps')
+
+# Metadata markers: [TAG: value], [COMMENT: text] and [image N] with an optional "- caption".
+# A caption runs to the end of the line or the next TAG/COMMENT marker, which is stripped, not captioned.
+METADATA_PATTERN = re.compile(
+    r'\[(?:TAG:\s*(?P<tag>[^\]]+)|COMMENT:\s*(?P<comment>[^\]]+)|(?i:image)\s+(?P<image>\d+))\]'
+    r'(?:(?=[ \t]*-[ \t]*(?P<caption>(?:(?!\[(?:TAG|COMMENT):)[^\n])*))|)'
+)
+
+
+# Fallback rewrite pipeline, compiled once and applied in two regex passes.
+# Pass 1 fuses collapsing 3+ line breaks with breaking paragraphs after sentence ends.
+EXCESS_BREAKS_PATTERN = re.compile(r'\n\s*\n\s*\n')
+FORMAT_PATTERN = re.compile(r'(?P<end>[.!?])\s*(?P<start>[A-Z])|\n\s*\n\s*\n')
+
+# Pass 2 fuses the technical-content enhancements. The lookarounds on the "..."
+# alternative reproduce the old one-substitution-at-a-time behaviour, where an
+# ellipsis touching TODO/FIXME/TBD/XXX had already lost its word boundary.
+ENHANCEMENT_REPLACEMENTS = {
+    'todo': '**TODO:**',
+    'fixme': '**FIXME:**',
+    'tbd': '**To Be Determined:**',
+    'xxx': '**Note:**',
+    'ellipsis': '**[Additional details to be added]**',
+    'implementation': '**Implementation:**',
+    'testing': '**Testing:**',
+    'results': '**Results:**',
+    'improvements': '**Improvements:**'
+}
+ENHANCEMENT_PATTERN = re.compile(
+    # Cheap first-character guard so most positions are rejected before the alternation
+    r'(?=[tfxir.])(?:'
+    r'\b(?:(?P<todo>TODO)|(?P<fixme>FIXME)|(?P<tbd>TBD)|(?P<xxx>XXX))\b'
+    r'|(?<!\bTODO)(?<!\bFIXME)(?<!\bTBD)(?<!\bXXX)\b(?P<ellipsis>\.\.\.)\b(?!(?:TODO|FIXME|TBD|XXX)\b)'
+    r'|\b(?:(?P<implementation>implement|implementation)'
+    r'|(?P<testing>test|testing)'
+    r'|(?P<results>result|results)'
+    r'|(?P<improvements>improve|improvement))\b'
+    r')',
+    re.IGNORECASE
+)
+
+REWRITE_SECTIONS = ['Overview', 'Technical Details', 'Implementation', 'Testing', 'Results', 'Improvements']
+REWRITE_HEADING_PATTERN = re.compile(r'# (' + '|'.join(REWRITE_SECTIONS) + ')')
+
+
+def _format_replacement(match: re.Match) -> str:
+    """Replacement for FORMAT_PATTERN matches"""
+    if match.group('end'):
+        return f"{match.group('end')}\n\n{match.group('start')}"
+    return '\n\n'
+
+
+def _enhancement_replacement(match: re.Match) -> str:
+    """Replacement for ENHANCEMENT_PATTERN matches"""
+    return ENHANCEMENT_REPLACEMENTS[match.lastgroup]
+
+@dataclass
+class ParsedSection:
+    """Cleaned EN section content together with the metadata markers found in it"""
+    content: str
+    tags: List[str] = field(default_factory=list)
+    comments: List[str] = field(default_factory=list)
+    images: List[Dict[str, Any]] = field(default_factory=list)
+    filepath: Optional[str] = None
+    last_modified: Optional[float] = None
+    
+    @cached_property
+    def lowered(self) -> str:
+        """Lowercased content, computed once for the gap heuristics"""
+        return self.content.lower()
+
+
+def scan_en_text(text: str) -> Tuple[str, List[str], List[str], List[Dict[str, Any]]]:
+    """
+    Scan raw EN text in a single pass, returning the cleaned content (TAG and
+    COMMENT markers removed) plus the tags, comments and image references found
+    """
+    tags = []
+    comments = []
+    images = []
+    pieces = []
+    last_end = 0
+    
+    for match in METADATA_PATTERN.finditer(text):
+        image = match.group('image')
+        if image is not None:
+            caption = match.group('caption')
+            images.append({'number': int(image), 'caption': caption.strip() if caption else ''})
+            continue
+        
+        tag = match.group('tag')
+        if tag is not None:
+            tags.append(tag)
+        else:
+            comments.append(match.group('comment'))
+        pieces.append(text[last_end:match.start()])
+        last_end = match.end()
+    
+    if not pieces:
+        return text.strip(), tags, comments, images
+    
+    pieces.append(text[last_end:])
+    return ''.join(pieces).strip(), tags, comments, images
+
+
+def parse_section_file(filepath: str) -> ParsedSection:
+    """Read an EN file and scan it into a ParsedSection (module-level so worker processes can pickle it)"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        text = f.read()
+    
+    content, tags, comments, images = scan_en_text(text)
+    return ParsedSection(
+        content=content,
+        tags=tags,
+        comments=comments,
+        images=images,
+        filepath=filepath,
+        last_modified=os.path.getmtime(filepath)
+    )
+
+
+def stage_text(path: Path, text: str) -> str:
+    """Write text to a synced temp file next to path and return the temp path"""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp_path
+    except BaseException:
+        _discard_temp(tmp_path)
+        raise
+
+
+def _discard_temp(tmp_path: str) -> None:
+    """Remove a staged temp file, ignoring errors"""
+    try:
+        os.unlink(tmp_path)
+    except OSError:
+        pass
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """Write text to path via a temp file in the same directory and an atomic rename"""
+    tmp_path = stage_text(path, text)
+    try:
+        os.replace(tmp_path, path)
+    except BaseException:
+        _discard_temp(tmp_path)
+        raise
+
+
+def _parse_section_or_none(filepath: str) -> Optional[ParsedSection]:
+    """Pool worker: parse a section file, returning None on failure"""
+    try:
+        return parse_section_file(filepath)
+    except Exception as e:
+        logger.error(f"Error parsing file {filepath}: {e}")
+        return None
+
+
+class SectionIndex:
+    """Cache of parsed EN sections keyed by file path and validated by mtime and size"""
+    
+    def __init__(self):
+        self.entries: Dict[str, Tuple[int, int, ParsedSection]] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def lookup(self, path: str, stat: os.stat_result) -> Optional[ParsedSection]:
+        """Return the cached parse for path if the file is unchanged since it was parsed"""
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        return None
+    
+    def store(self, path: str, stat: os.stat_result, parsed: ParsedSection) -> None:
+        """Record the parse of path at its current mtime and size"""
+        self.entries[path] = (stat.st_mtime_ns, stat.st_size, parsed)
+    
+    def prune(self, live_paths: set) -> None:
+        """Drop entries for files that no longer exist"""
+        for path in [p for p in self.entries if p not in live_paths]:
+            del self.entries[path]
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get index size and hit/miss counters"""
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+class GapReportCache:
+    """
+    Per-section gap results keyed by content hash, with the aggregate report
+    kept as per-category membership sets that are patched as sections change.
+    
+    Shared by concurrent request threads and the streaming endpoint, so every
+    read and update goes through the lock; classification itself runs outside it.
+    """
+    
+    def __init__(self):
+        # section name -> (content hash, categories)
+        self.results: Dict[str, Tuple[str, frozenset]] = {}
+        self.members: Dict[str, Dict[str, None]] = {category: {} for category in SECTION_GAP_CATEGORIES}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+    
+    def lookup(self, section_name: str, content_hash: str) -> Optional[frozenset]:
+        """Cached categories if the section's content is unchanged, else None"""
+        with self.lock:
+            cached = self.results.get(section_name)
+            if cached is not None and cached[0] == content_hash:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+            return None
+    
+    def store(self, section_name: str, content_hash: str, categories: frozenset) -> None:
+        """Record a section's categories and patch the aggregate report"""
+        with self.lock:
+            self.patch(section_name, categories)
+            self.results[section_name] = (content_hash, categories)
+    
+    def patch(self, section_name: str, categories: frozenset) -> None:
+        """Move section_name into exactly the given categories"""
+        with self.lock:
+            previous = self.results[section_name][1] if section_name in self.results else frozenset()
+            for category in previous - categories:
+                self.members[category].pop(section_name, None)
+            for category in categories - previous:
+                self.members[category][section_name] = None
+    
+    def remove(self, section_name: str) -> None:
+        """Forget a section that is no longer present"""
+        with self.lock:
+            entry = self.results.pop(section_name, None)
+            if entry is None:
+                return
+            for category in entry[1]:
+                self.members[category].pop(section_name, None)
+    
+    def remove_missing(self, present: Iterable[str]) -> None:
+        """Forget every cached section not in present"""
+        with self.lock:
+            for section_name in [name for name in self.results if name not in present]:
+                self.remove(section_name)
+    
+    def report(self, order: List[str]) -> Dict[str, List[str]]:
+        """
+        Consistent snapshot of the sections in each gap category, listed in
+        section order so warm and cold runs give identical reports
+        """
+        with self.lock:
+            return {category: [name for name in order if name in members]
+                    for category, members in self.members.items()}
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get cached section count and hit/miss counters"""
+        with self.lock:
+            return {
+                'sections': len(self.results),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Writers with possibly unflushed state; weak so the exit hook doesn't keep them alive
+_live_writers: "weakref.WeakSet[ENWriter]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_writers() -> None:
+    """Flush every live writer's pending planning sheet changes at interpreter exit"""
+    for writer in list(_live_writers):
+        writer.flush_planning_sheet()
+
 
 class ENWriter:
     """Main class for the Engineering Notebook Writer agent"""
     
-    def __init__(self, base_dir: str, planning_file: str = "planning_sheet.json"):
+    # Below this many changed files a pool costs more to start than it saves
+    PARALLEL_LOAD_THRESHOLD = 64
+    # Gap report caches kept (one per project scope); least recently used are dropped
+    GAP_CACHE_SCOPES = 64
+    
+    def __init__(self, base_dir: str, planning_file: str = "planning_sheet.json",
+                 load_workers: int = 0, load_executor: str = "process",
+                 gap_indicators: Optional[Dict[str, List[str]]] = None,
+                 planning_flush_interval: float = 2.0, planning_flush_threshold: int = 20,
+                 activity_log_limit: int = 1000, activity_log_compress: bool = False):
         self.base_dir = Path(base_dir)
+        self.load_workers = load_workers
+        self.load_executor = load_executor
+        self._gap_caches_lock = threading.Lock()
+        self.configure_gap_indicators(gap_indicators)
         self.planning_file = self.base_dir / planning_file
         self.sections = {}
+        self.parsed_sections: Dict[str, ParsedSection] = {}
+        self.section_index = SectionIndex()
         self.planning_data = self._load_planning_sheet()
-        self.activity_log = []
+        # Most recent entries only; the full history lives in the log files
+        self.activity_log = deque(maxlen=activity_log_limit)
+        self.activity_log_compress = activity_log_compress
+        self._activity_writers: Dict[str, ActivityLogWriter] = {}
+        # path -> (mtime_ns, size, content digest) of files written by save_en_files
+        self._saved_digests: Dict[str, Tuple[int, int, str]] = {}
+        
+        # Write-behind state for the planning sheet
+        self.planning_flush_interval = planning_flush_interval
+        self.planning_flush_threshold = planning_flush_threshold
+        self._planning_lock = threading.Lock()
+        self._planning_pending = 0
+        self._planning_timer = None
+        _live_writers.add(self)
         
     def _load_planning_sheet(self) -> Dict[str, Any]:
         """Load or create planning sheet"""
@@ -53,137 +403,263 @@ class ENWriter:
             "completed_sections": []
         }
     
-    def load_en_sections(self, dir_path: str) -> Dict[str, str]:
-        """Load and parse all EN files from directory"""
+    def load_en_sections(self, dir_path: str, workers: Optional[int] = None,
+                         executor: Optional[str] = None) -> Dict[str, str]:
+        """
+        Load and parse all EN files from directory, re-parsing only changed files.
+        
+        With workers > 1 the changed files are parsed in a "process" or "thread"
+        pool; defaults come from the load_workers/load_executor constructor args.
+        """
         sections = {}
         en_dir = Path(dir_path)
         
         if not en_dir.exists():
             logger.error(f"Directory {dir_path} does not exist")
             return sections
+        
+        workers = self.load_workers if workers is None else workers
+        executor = executor or self.load_executor
+        
+        parsed_sections = {}
+        stale = []
+        live_paths = set()
+        with os.scandir(en_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.txt') or not entry.is_file():
+                    continue
+                section_name = entry.name[:-4]
+                try:
+                    stat = entry.stat()
+                except OSError as e:
+                    logger.error(f"Error loading {entry.path}: {e}")
+                    continue
+                live_paths.add(entry.path)
+                parsed = self.section_index.lookup(entry.path, stat)
+                # Reserve the slot so results keep directory order
+                parsed_sections[section_name] = parsed
+                if parsed is None:
+                    stale.append((section_name, entry.path, stat))
+        
+        if stale:
+            paths = [path for _, path, _ in stale]
+            if workers and workers > 1 and len(stale) >= self.PARALLEL_LOAD_THRESHOLD:
+                results = self._parse_sections_parallel(paths, workers, executor)
+            else:
+                results = [_parse_section_or_none(path) for path in paths]
             
-        for file_path in en_dir.glob("*.txt"):
-            try:
-                content = self.parse_en_file(str(file_path))
-                section_name = file_path.stem
-                sections[section_name] = content
-                logger.info(f"Loaded section: {section_name}")
-            except Exception as e:
-                logger.error(f"Error loading {file_path}: {e}")
-                
+            for (section_name, path, stat), parsed in zip(stale, results):
+                if parsed is None:
+                    parsed = ParsedSection(content="", filepath=path)
+                else:
+                    self.section_index.store(path, stat, parsed)
+                parsed_sections[section_name] = parsed
+            logger.info(f"Parsed {len(stale)} changed sections")
+        
+        for section_name, parsed in parsed_sections.items():
+            sections[section_name] = parsed.content
+        
+        self.section_index.prune(live_paths)
+        stats = self.section_index.get_stats()
+        logger.info(f"Loaded {len(sections)} sections (index hits: {stats['hits']}, misses: {stats['misses']})")
+        
         self.sections = sections
+        self.parsed_sections = parsed_sections
         return sections
     
+    def _parse_sections_parallel(self, paths: List[str], workers: int, 
+                                 executor: str) -> List[Optional[ParsedSection]]:
+        """Parse section files in a worker pool, preserving input order"""
+        pool_class = ThreadPoolExecutor if executor == "thread" else ProcessPoolExecutor
+        # Large chunks amortise the per-task pickling overhead of a process pool
+        chunksize = max(1, len(paths) // (workers * 4))
+        
+        try:
+            with pool_class(max_workers=workers) as pool:
+                return list(pool.map(_parse_section_or_none, paths, chunksize=chunksize))
+        except Exception as e:
+            logger.error(f"Parallel section load failed, falling back to serial parsing: {e}")
+            return [_parse_section_or_none(path) for path in paths]
+    
+    def parse_en_section(self, filepath: str) -> ParsedSection:
+        """Read an EN file and scan it into a ParsedSection"""
+        return parse_section_file(filepath)
+    
     def parse_en_file(self, filepath: str) -> str:
         """Parse individual EN file and extract content"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Extract metadata and content
-            # Look for tags and comments in format [TAG: value] or [COMMENT: text]
-            tags = re.findall(r'\[TAG:\s*([^\]]+)\]', content)
-            comments = re.findall(r'\[COMMENT:\s*([^\]]+)\]', content)
-            images = re.findall(r'\[image\s+(\d+)\]', content, re.IGNORECASE)
-            
-            # Store metadata for later use
-            metadata = {
-                'tags': tags,
-                'comments': comments,
-                'images': images,
-                'filepath': filepath,
-                'last_modified': os.path.getmtime(filepath)
-            }
-            
-            # Clean content for processing (remove metadata markers)
-            clean_content = re.sub(r'\[TAG:\s*[^\]]+\]', '', content)
-            clean_content = re.sub(r'\[COMMENT:\s*[^\]]+\]', '', clean_content)
-            
-            return clean_content.strip()
-            
+            return self.parse_en_section(filepath).content
         except Exception as e:
             logger.error(f"Error parsing file {filepath}: {e}")
             return ""
     
+    def get_parsed_section(self, section_name: str, content: Optional[str] = None) -> ParsedSection:
+        """
+        Get the ParsedSection for a loaded section, falling back to a bare parse of
+        content when the section was never loaded from disk or has since been edited
+        """
+        parsed = self.parsed_sections.get(section_name)
+        if content is None:
+            content = self.sections.get(section_name, "")
+        if parsed is not None and (parsed.content is content or parsed.content == content):
+            return parsed
+        return ParsedSection(content=content)
+    
     def update_planning_sheet(self, updates: Dict[str, Any]) -> None:
-        """Update planning sheet with new information"""
-        try:
+        """
+        Update planning sheet with new information.
+        
+        Writes are deferred: updates are coalesced in memory and flushed after
+        planning_flush_interval seconds or once planning_flush_threshold updates
+        are pending, whichever comes first.
+        """
+        flush_now = False
+        with self._planning_lock:
             self.planning_data.update(updates)
             self.planning_data['last_updated'] = datetime.now().isoformat()
+            self._planning_pending += 1
             
-            # Save to file
-            with open(self.planning_file, 'w', encoding='utf-8') as f:
-                json.dump(self.planning_data, f, indent=2, ensure_ascii=False)
-                
-            logger.info("Planning sheet updated successfully")
+            if self._planning_pending >= self.planning_flush_threshold:
+                flush_now = True
+            elif self._planning_timer is None:
+                self._planning_timer = threading.Timer(self.planning_flush_interval, self.flush_planning_sheet)
+                self._planning_timer.daemon = True
+                self._planning_timer.start()
+        
+        if flush_now:
+            self.flush_planning_sheet()
+    
+    def flush_planning_sheet(self) -> bool:
+        """Write pending planning sheet updates to disk atomically; returns True if anything was written"""
+        with self._planning_lock:
+            if self._planning_timer is not None:
+                self._planning_timer.cancel()
+                self._planning_timer = None
             
-        except Exception as e:
-            logger.error(f"Error updating planning sheet: {e}")
-    
-    def analyze_sections_for_gaps(self, sections: Dict[str, str]) -> Dict[str, Any]:
-        """Analyze sections for completeness and identify gaps"""
-        gap_analysis = {
-            'incomplete_sections': [],
-            'missing_sections': [],
-            'unclear_content': [],
-            'missing_images': [],
-            'technical_gaps': []
-        }
+            if self._planning_pending == 0:
+                return False
+            
+            try:
+                atomic_write_text(
+                    self.planning_file,
+                    json.dumps(self.planning_data, indent=2, ensure_ascii=False)
+                )
+                logger.info(f"Planning sheet saved ({self._planning_pending} updates coalesced)")
+                self._planning_pending = 0
+                return True
+                
+            except Exception as e:
+                logger.error(f"Error updating planning sheet: {e}")
+                return False
+    
+    def close(self) -> None:
+        """Flush pending writes; the writer is no longer flushed at exit"""
+        self.flush_planning_sheet()
+        for writer in self._activity_writers.values():
+            writer.close()
+        _live_writers.discard(self)
+    
+    def analyze_sections_for_gaps(self, sections: Dict[str, str], scope: str = "default") -> Dict[str, Any]:
+        """
+        Analyze sections for completeness and identify gaps.
         
-        # Define expected sections for robotics EN
-        expected_sections = [
-            'system_overview', 'hardware_design', 'software_architecture',
-            'control_systems', 'sensors', 'actuators', 'testing_procedures',
-            'results_analysis', 'future_improvements', 'references'
-        ]
+        Results are cached per scope (e.g. one per project): only sections whose
+        content hash changed since the last call for that scope are re-analyzed.
+        """
+        cache = self._gap_cache(scope)
         
-        # Check for missing sections
-        for section in expected_sections:
-            if section not in sections:
-                gap_analysis['missing_sections'].append(section)
+        # Drop sections that disappeared since the last analysis
+        cache.remove_missing(sections)
         
-        # Analyze existing sections
+        # Analyze new or changed sections
         for section_name, content in sections.items():
-            if not content or len(content.strip()) < 100:
-                gap_analysis['incomplete_sections'].append(section_name)
-            
-            # Check for technical completeness
-            if self._has_technical_gaps(content):
-                gap_analysis['technical_gaps'].append(section_name)
-            
-            # Check for unclear content
-            if self._is_content_unclear(content):
-                gap_analysis['unclear_content'].append(section_name)
-            
-            # Check for missing images
-            if self._needs_images(content):
-                gap_analysis['missing_images'].append(section_name)
-        
-        return gap_analysis
-    
-    def _has_technical_gaps(self, content: str) -> bool:
-        """Check if content has technical gaps"""
-        # Look for placeholder text or incomplete technical details
-        placeholders = ['TODO', 'TBD', 'FIXME', 'XXX', '...']
-        return any(placeholder in content.upper() for placeholder in placeholders)
-    
-    def _is_content_unclear(self, content: str) -> bool:
-        """Check if content is unclear or needs clarification"""
-        # Simple heuristics for unclear content
-        unclear_indicators = [
-            'unclear', 'confusing', 'needs clarification', 'not sure',
-            'maybe', 'possibly', 'might be', 'could be'
-        ]
-        return any(indicator in content.lower() for indicator in unclear_indicators)
-    
-    def _needs_images(self, content: str) -> bool:
-        """Check if content would benefit from images"""
-        # Look for technical descriptions that typically need diagrams
-        image_indicators = [
-            'diagram', 'schematic', 'flowchart', 'architecture',
-            'circuit', 'mechanical design', 'assembly', 'layout'
-        ]
-        return any(indicator in content.lower() for indicator in image_indicators)
+            self._analyze_section_cached(cache, section_name, content)
+        
+        report = cache.report(list(sections))
+        return {
+            'incomplete_sections': report['incomplete_sections'],
+            'missing_sections': [section for section in EXPECTED_SECTIONS if section not in sections],
+            'unclear_content': report['unclear_content'],
+            'missing_images': report['missing_images'],
+            'technical_gaps': report['technical_gaps']
+        }
+    
+    def iter_section_gaps(self, sections: Union[Dict[str, str], Iterable[Tuple[str, str]]],
+                          scope: str = "default") -> Iterator[Dict[str, Any]]:
+        """
+        Generator version of analyze_sections_for_gaps.
+        
+        Yields {'section': name, 'gaps': [...]} for each section as it is analyzed,
+        then a final {'missing_sections': [...]}. Accepts a dict or any iterable of
+        (name, content) pairs, so callers can stream sections without building a dict.
+        Shares the per-scope cache with analyze_sections_for_gaps.
+        """
+        cache = self._gap_cache(scope)
+        items = sections.items() if isinstance(sections, dict) else sections
+        
+        seen = set()
+        for section_name, content in items:
+            seen.add(section_name)
+            categories = self._analyze_section_cached(cache, section_name, content)
+            yield {
+                'section': section_name,
+                'gaps': [category for category in SECTION_GAP_CATEGORIES if category in categories]
+            }
+        
+        # Drop sections that disappeared since the last analysis
+        cache.remove_missing(seen)
+        
+        yield {'missing_sections': [section for section in EXPECTED_SECTIONS if section not in seen]}
+    
+    def _analyze_section_cached(self, cache: GapReportCache, section_name: str, content: str) -> frozenset:
+        """Return a section's gap categories, re-classifying only if its content hash changed"""
+        content_hash = hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+        cached = cache.lookup(section_name, content_hash)
+        if cached is not None:
+            return cached
+        
+        categories = self._classify_section(section_name, content)
+        cache.store(section_name, content_hash, categories)
+        return categories
+    
+    def _classify_section(self, section_name: str, content: str) -> frozenset:
+        """Return the gap categories a single section falls into"""
+        categories = set()
+        if not content or len(content.strip()) < 100:
+            categories.add('incomplete_sections')
+        
+        # Technical gaps, unclear content and missing images in one pass
+        lowered = self.get_parsed_section(section_name, content).lowered
+        categories.update(self.gap_matcher.find_categories(lowered))
+        return frozenset(categories)
+    
+    def configure_gap_indicators(self, gap_indicators: Optional[Dict[str, List[str]]] = None) -> None:
+        """
+        Set the indicator words for technical_gaps, unclear_content and missing_images.
+        Categories not given keep their defaults.
+        """
+        indicators = {category: list(words) for category, words in DEFAULT_GAP_INDICATORS.items()}
+        for category, words in (gap_indicators or {}).items():
+            if category not in indicators:
+                raise ValueError(f"Unknown gap category: {category}")
+            indicators[category] = list(words)
+        
+        self.gap_indicators = indicators
+        self.gap_matcher = KeywordMatcher(indicators)
+        # Cached results were computed with the old indicators
+        self.gap_caches: "OrderedDict[str, GapReportCache]" = OrderedDict()
+    
+    def _gap_cache(self, scope: str) -> GapReportCache:
+        """The scope's gap cache, evicting the least recently used scope beyond GAP_CACHE_SCOPES"""
+        with self._gap_caches_lock:
+            cache = self.gap_caches.get(scope)
+            if cache is None:
+                cache = self.gap_caches[scope] = GapReportCache()
+                while len(self.gap_caches) > self.GAP_CACHE_SCOPES:
+                    self.gap_caches.popitem(last=False)
+            else:
+                self.gap_caches.move_to_end(scope)
+            return cache
     
     def generate_user_questions(self, gap_info: Dict[str, Any]) -> List[str]:
         """Generate targeted questions for user based on gap analysis using AI service"""
@@ -203,7 +679,6 @@ class ENWriter:
             """
             
             # Use AI service to generate questions
-            ai_client = get_ai_client()
             task_manager = get_task_manager()
             
             agent_config = AgentConfig(
@@ -215,7 +690,7 @@ class ENWriter:
             task_id = task_manager.start_task(prompt_context, agent_config)
             
             # Poll for completion
-            response = ai_client.poll_task_completion(task_id, max_wait_time=60)
+            response = task_manager.poll_task_completion(task_id, max_wait_time=60)
             
             if response.status == TaskStatus.COMPLETED.value and response.agent_reply:
                 # Parse AI response to extract questions
@@ -227,6 +702,10 @@ class ENWriter:
             logger.warning(f"AI service failed for question generation, using fallback: {response.error}")
             return self._generate_fallback_questions(gap_info)
             
+        except CircuitOpenError:
+            logger.info("AI service unavailable (circuit open), using fallback questions")
+            return self._generate_fallback_questions(gap_info)
+            
         except Exception as e:
             logger.error(f"Error generating questions with AI service: {e}")
             return self._generate_fallback_questions(gap_info)
@@ -319,7 +798,6 @@ class ENWriter:
             """
             
             # Use AI service to generate draft
-            ai_client = get_ai_client()
             task_manager = get_task_manager()
             
             agent_config = AgentConfig(
@@ -331,7 +809,7 @@ class ENWriter:
             task_id = task_manager.start_task(prompt_context, agent_config)
             
             # Poll for completion
-            response = ai_client.poll_task_completion(task_id, max_wait_time=120)
+            response = task_manager.poll_task_completion(task_id, max_wait_time=120)
             
             if response.status == TaskStatus.COMPLETED.value and response.agent_reply:
                 # Clean up and format the AI response
@@ -342,6 +820,10 @@ class ENWriter:
             logger.warning(f"AI service failed for draft generation, using fallback: {response.error}")
             return self._generate_fallback_draft(user_inputs)
             
+        except CircuitOpenError:
+            logger.info("AI service unavailable (circuit open), using fallback draft")
+            return self._generate_fallback_draft(user_inputs)
+            
         except Exception as e:
             logger.error(f"Error generating draft with AI service: {e}")
             return self._generate_fallback_draft(user_inputs)
@@ -508,7 +990,6 @@ class ENWriter:
             """
             
             # Use AI service to rewrite content
-            ai_client = get_ai_client()
             task_manager = get_task_manager()
             
             agent_config = AgentConfig(
@@ -520,7 +1001,7 @@ class ENWriter:
             task_id = task_manager.start_task(prompt_context, agent_config)
             
             # Poll for completion
-            response = ai_client.poll_task_completion(task_id, max_wait_time=120)
+            response = task_manager.poll_task_completion(task_id, max_wait_time=120)
             
             if response.status == TaskStatus.COMPLETED.value and response.agent_reply:
                 # Clean up and format the AI response
@@ -531,6 +1012,10 @@ class ENWriter:
             logger.warning(f"AI service failed for rewrite, using fallback: {response.error}")
             return self._generate_fallback_rewrite(entry_text)
             
+        except CircuitOpenError:
+            logger.info("AI service unavailable (circuit open), using fallback rewrite")
+            return self._generate_fallback_rewrite(entry_text)
+            
         except Exception as e:
             logger.error(f"Error rewriting with AI service: {e}")
             return self._generate_fallback_rewrite(entry_text)
@@ -545,17 +1030,14 @@ class ENWriter:
         rewritten = ai_response.strip()
         
         # Ensure proper line breaks
-        rewritten = re.sub(r'\n\s*\n\s*\n', '\n\n', rewritten)
+        rewritten = EXCESS_BREAKS_PATTERN.sub('\n\n', rewritten)
         
         return rewritten
     
     def _generate_fallback_rewrite(self, entry_text: str) -> str:
         """Generate fallback rewrite using template-based approach"""
-        improved_text = entry_text
-        
-        # Fix common formatting issues
-        improved_text = re.sub(r'\n\s*\n\s*\n', '\n\n', improved_text)  # Remove excessive line breaks
-        improved_text = re.sub(r'([.!?])\s*([A-Z])', r'\1\n\n\2', improved_text)  # Add paragraph breaks
+        # Fix common formatting issues: remove excessive line breaks, add paragraph breaks
+        improved_text = FORMAT_PATTERN.sub(_format_replacement, entry_text)
         
         # Enhance technical content
         improved_text = self._enhance_technical_content(improved_text)
@@ -570,35 +1052,20 @@ class ENWriter:
     
     def _enhance_technical_content(self, text: str) -> str:
         """Enhance technical content with better descriptions"""
-        enhancements = {
-            r'\bTODO\b': '**TODO:**',
-            r'\bFIXME\b': '**FIXME:**',
-            r'\bTBD\b': '**To Be Determined:**',
-            r'\bXXX\b': '**Note:**',
-            r'\b\.\.\.\b': '**[Additional details to be added]**',
-            r'\b(?:implement|implementation)\b': '**Implementation:**',
-            r'\b(?:test|testing)\b': '**Testing:**',
-            r'\b(?:result|results)\b': '**Results:**',
-            r'\b(?:improve|improvement)\b': '**Improvements:**'
-        }
-        
-        for pattern, replacement in enhancements.items():
-            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
-        
-        return text
+        return ENHANCEMENT_PATTERN.sub(_enhancement_replacement, text)
     
     def _improve_structure(self, text: str) -> str:
         """Improve the structure and organization of the text"""
         # Ensure proper heading hierarchy
         if not text.startswith('#'):
-            first_line = text.split('\n')[0]
+            first_line = text.partition('\n')[0]
             text = f"# {first_line}\n\n{text}"
         
         # Add missing sections if they don't exist
-        sections = ['Overview', 'Technical Details', 'Implementation', 'Testing', 'Results', 'Improvements']
-        for section in sections:
-            if f"## {section}" not in text and f"# {section}" not in text:
-                text += f"\n\n## {section}\n[Content to be added]"
+        present = set(REWRITE_HEADING_PATTERN.findall(text))
+        missing = [section for section in REWRITE_SECTIONS if section not in present]
+        if missing:
+            text += ''.join(f"\n\n## {section}\n[Content to be added]" for section in missing)
         
         return text
     
@@ -609,24 +1076,84 @@ class ENWriter:
             text += "\\n\\n**[Technical Note:]** This section requires additional technical details, specifications, and implementation information to meet engineering documentation standards."
         
         # Add improvement suggestions
-        if 'improvement' not in text.lower() and 'future' not in text.lower():
+        lowered = text.lower()
+        if 'improvement' not in lowered and 'future' not in lowered:
             text += "\\n\\n## Future Improvements\\n[Future enhancements and optimizations to be documented]"
         
         return text
     
-    def save_en_files(self, updated_sections: Dict[str, str]) -> None:
-        """Save updated EN files to disk"""
+    def save_en_files(self, updated_sections: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Save updated EN files to disk as one batch.
+        
+        Sections whose content already matches the file on disk are skipped. Changed
+        sections are first staged to temp files; if any staging fails the batch is
+        abandoned and no file is touched, otherwise each file is atomically replaced.
+        Returns {'written': [...], 'unchanged': [...], 'failed': {section: error}}.
+        """
+        result = {'written': [], 'unchanged': [], 'failed': {}}
+        staged = []
+        
         try:
             for section_name, content in updated_sections.items():
                 file_path = self.base_dir / f"{section_name}.txt"
+                data = content.encode('utf-8')
+                digest = hashlib.blake2b(data, digest_size=16).hexdigest()
                 
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                
-                logger.info(f"Saved section: {section_name}")
+                if self._matches_disk(file_path, data, digest):
+                    result['unchanged'].append(section_name)
+                    continue
                 
+                try:
+                    staged.append((section_name, file_path, stage_text(file_path, content), digest))
+                except Exception as e:
+                    result['failed'][section_name] = str(e)
+            
+            if result['failed']:
+                logger.error(f"Error saving EN files, batch abandoned: {result['failed']}")
+                for _, _, tmp_path, _ in staged:
+                    _discard_temp(tmp_path)
+                return result
+            
+            # Commit: every file is staged, swap them into place
+            for section_name, file_path, tmp_path, digest in staged:
+                try:
+                    os.replace(tmp_path, file_path)
+                    stat = file_path.stat()
+                    self._saved_digests[str(file_path)] = (stat.st_mtime_ns, stat.st_size, digest)
+                    result['written'].append(section_name)
+                    logger.info(f"Saved section: {section_name}")
+                except Exception as e:
+                    _discard_temp(tmp_path)
+                    result['failed'][section_name] = str(e)
+                    logger.error(f"Error saving section {section_name}: {e}")
+            
         except Exception as e:
             logger.error(f"Error saving EN files: {e}")
+            for _, _, tmp_path, _ in staged:
+                _discard_temp(tmp_path)
+        
+        if result['unchanged']:
+            logger.info(f"Skipped {len(result['unchanged'])} unchanged sections")
+        return result
+    
+    def _matches_disk(self, file_path: Path, data: bytes, digest: str) -> bool:
+        """Check whether file_path already holds exactly data"""
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return False
+        
+        if stat.st_size != len(data):
+            return False
+        
+        # Files we wrote and nobody touched since can be checked without reading them
+        saved = self._saved_digests.get(str(file_path))
+        if saved is not None and saved[0] == stat.st_mtime_ns and saved[1] == stat.st_size:
+            return saved[2] == digest
+        
+        with open(file_path, 'rb') as f:
+            return f.read() == data
     
     def log_agent_activity(self, activity_log_filepath: str, log_entry: Dict[str, Any]) -> None:
         """Log agent activity for tracking and debugging"""
@@ -634,16 +1161,23 @@ class ENWriter:
             log_entry['timestamp'] = datetime.now().isoformat()
             self.activity_log.append(log_entry)
             
-            # Save to file
-            with open(activity_log_filepath, 'a', encoding='utf-8') as f:
-                json.dump(log_entry, f, ensure_ascii=False)
-                f.write('\n')
+            # Buffered append to the JSONL file
+            writer = self._activity_writers.get(activity_log_filepath)
+            if writer is None:
+                writer = ActivityLogWriter(activity_log_filepath, compress=self.activity_log_compress)
+                self._activity_writers[activity_log_filepath] = writer
+            writer.write(log_entry)
                 
             logger.info(f"Activity logged: {log_entry.get('action', 'unknown')}")
             
         except Exception as e:
             logger.error(f"Error logging activity: {e}")
     
+    def flush_activity_logs(self) -> None:
+        """Write any buffered activity log entries to disk"""
+        for writer in self._activity_writers.values():
+            writer.flush()
+    
     def get_status_summary(self) -> Dict[str, Any]:
         """Get current status summary"""
         return {
@@ -652,7 +1186,8 @@ class ENWriter:
             'completed_sections': len(self.planning_data.get('completed_sections', [])),
             'pending_questions': len(self.planning_data.get('user_questions', [])),
             'last_updated': self.planning_data.get('last_updated', 'Never'),
-            'current_focus': self.planning_data.get('current_focus', 'None')
+            'current_focus': self.planning_data.get('current_focus', 'None'),
+            'section_index': self.section_index.get_stats()
         }
 
 
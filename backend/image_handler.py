@@ -209,26 +209,36 @@ class ImageHandler:
         pattern = r'\[image\s+(\d+)\](?:\s*-\s*(.+?))?(?=\n|$)'
         matches = re.findall(pattern, text, re.IGNORECASE | re.MULTILINE)
         
+        return self.resolve_image_references([
+            {'number': int(match[0]), 'caption': match[1].strip() if match[1] else ""}
+            for match in matches
+        ])
+    
+    def resolve_image_references(self, image_refs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Attach metadata to already-extracted image references (e.g. ParsedSection.images)"""
         references = []
-        for match in matches:
-            image_number = int(match[0])
-            caption = match[1].strip() if match[1] else ""
+        for ref in image_refs:
+            image_number = ref['number']
             
             # Get metadata for this image
             metadata = self.get_image_metadata(image_number)
             
             references.append({
                 'number': image_number,
-                'caption': caption,
+                'caption': ref.get('caption', ''),
                 'metadata': metadata,
                 'has_file': metadata and metadata.get('file_path') is not None
             })
         
         return references
     
-    def validate_image_references(self, text: str) -> Dict[str, Any]:
-        """Validate all image references in text"""
-        references = self.extract_image_references(text)
+    def validate_image_references(self, text: str, 
+                                  image_refs: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Validate all image references in text, reusing image_refs when already extracted"""
+        if image_refs is not None:
+            references = self.resolve_image_references(image_refs)
+        else:
+            references = self.extract_image_references(text)
         
         validation = {
             'total_references': len(references),
@@ -326,11 +336,11 @@ class ImageEnhancedENWriter:
                 )
                 
                 # Add to section content
-                if section_name in self.en_writer.en_writer.sections:
-                    content = self.en_writer.en_writer.sections[section_name]
+                if section_name in self.en_writer.sections:
+                    content = self.en_writer.sections[section_name]
                     content += f"\n\n{placeholder}"
-                    self.en_writer.en_writer.sections[section_name] = content
-                    self.en_writer.en_writer.save_en_files({section_name: content})
+                    self.en_writer.sections[section_name] = content
+                    self.en_writer.save_en_files({section_name: content})
                 
                 return True
             
@@ -346,19 +356,23 @@ class ImageEnhancedENWriter:
     
     def get_section_images(self, section_name: str) -> List[Dict[str, Any]]:
         """Get all images referenced in a section"""
-        if section_name not in self.en_writer.en_writer.sections:
+        if section_name not in self.en_writer.sections:
             return []
         
-        content = self.en_writer.en_writer.sections[section_name]
-        return self.image_handler.extract_image_references(content)
+        parsed = self.en_writer.get_parsed_section(section_name)
+        if parsed.filepath is not None:
+            return self.image_handler.resolve_image_references(parsed.images)
+        return self.image_handler.extract_image_references(parsed.content)
     
     def validate_section_images(self, section_name: str) -> Dict[str, Any]:
         """Validate all images in a section"""
-        if section_name not in self.en_writer.en_writer.sections:
+        if section_name not in self.en_writer.sections:
             return {'error': 'Section not found'}
         
-        content = self.en_writer.en_writer.sections[section_name]
-        return self.image_handler.validate_image_references(content)
+        parsed = self.en_writer.get_parsed_section(section_name)
+        if parsed.filepath is not None:
+            return self.image_handler.validate_image_references(parsed.content, parsed.images)
+        return self.image_handler.validate_image_references(parsed.content)
 
 
 # Example usage
@@ -0,0 +1,116 @@
+"""
+Background Job Queue for EN Writer
+Runs long AI generation work (drafts, rewrites) off the request thread
+"""
+
+import time
+import uuid
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+class JobQueue:
+    """
+    Fire-and-forget job runner on a thread pool.
+
+    submit() returns a job id immediately; callers poll get_job() for status and
+    get_result() for the return value. Finished jobs are kept for job_ttl seconds
+    and at most max_finished_jobs of them are retained (oldest dropped first).
+    """
+
+    def __init__(self, max_workers: int = 4, max_finished_jobs: int = 500, job_ttl: float = 3600):
+        self.max_finished_jobs = max_finished_jobs
+        self.job_ttl = job_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="en-job")
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, func: Callable, *args, **kwargs) -> str:
+        """Queue func(*args, **kwargs) and return its job id"""
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'kind': kind,
+                'status': JOB_QUEUED,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'error': None,
+                'result': None
+            }
+
+        self._executor.submit(self._run, job_id, func, args, kwargs)
+        logger.info(f"Queued {kind} job {job_id}")
+        return job_id
+
+    def _run(self, job_id: str, func: Callable, args: tuple, kwargs: Dict[str, Any]) -> None:
+        """Worker wrapper: run the job and record its outcome"""
+        self._update(job_id, status=JOB_RUNNING, started_at=time.time())
+        try:
+            result = func(*args, **kwargs)
+            self._update(job_id, status=JOB_COMPLETED, result=result, finished_at=time.time())
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            self._update(job_id, status=JOB_FAILED, error=str(e), finished_at=time.time())
+
+    def _update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def _prune(self) -> None:
+        """Drop expired finished jobs and enforce max_finished_jobs (lock held)"""
+        now = time.time()
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job['status'] in (JOB_COMPLETED, JOB_FAILED)]
+        excess = len(finished) - self.max_finished_jobs
+        for job_id in finished:
+            job = self._jobs[job_id]
+            if excess > 0 or now - job['finished_at'] > self.job_ttl:
+                del self._jobs[job_id]
+                excess -= 1
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job status without its result, or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            info = {key: value for key, value in job.items() if key != 'result'}
+
+        if info['finished_at']:
+            info['duration'] = info['finished_at'] - (info['started_at'] or info['created_at'])
+        return info
+
+    def get_result(self, job_id: str) -> Any:
+        """Return value of a completed job (None if not completed)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job['result'] if job and job['status'] == JOB_COMPLETED else None
+
+    def get_stats(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        with self._lock:
+            stats = {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_COMPLETED: 0, JOB_FAILED: 0}
+            for job in self._jobs.values():
+                stats[job['status']] += 1
+        return stats
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting jobs and optionally wait for running ones"""
+        self._executor.shutdown(wait=wait)
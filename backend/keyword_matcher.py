@@ -0,0 +1,63 @@
+"""
+Multi-pattern Keyword Matcher
+Finds which keyword categories occur in a text in a single pass
+"""
+
+from typing import Dict, List, Set, Iterable
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+class KeywordMatcher:
+    """
+    Compiled matcher over categorised keywords.
+
+    Uses a pyahocorasick automaton when the package is installed, so a text is
+    scanned once regardless of how many keywords are configured. Without it,
+    falls back to substring checks per keyword, which in CPython beat a single
+    regex alternation for keyword lists of this size.
+    Matching is case-sensitive; lowercase the text first for case-insensitive
+    lookups (keywords are lowercased on compile).
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        self.categories = {name: [kw.lower() for kw in keywords if kw]
+                           for name, keywords in categories.items()}
+        self._all_categories = frozenset(name for name, keywords in self.categories.items() if keywords)
+
+        self._automaton = None
+        if AHOCORASICK_AVAILABLE and self._all_categories:
+            # keyword -> categories it belongs to
+            keyword_categories: Dict[str, Set[str]] = {}
+            for name, keywords in self.categories.items():
+                for keyword in keywords:
+                    keyword_categories.setdefault(keyword, set()).add(name)
+
+            self._automaton = ahocorasick.Automaton()
+            for keyword, cats in keyword_categories.items():
+                self._automaton.add_word(keyword, frozenset(cats))
+            self._automaton.make_automaton()
+
+    def find_categories(self, text: str) -> Set[str]:
+        """Return the set of categories with at least one keyword in text"""
+        found: Set[str] = set()
+
+        if self._automaton is not None:
+            for _, cats in self._automaton.iter(text):
+                found |= cats
+                if len(found) == len(self._all_categories):
+                    break
+        else:
+            for name, keywords in self.categories.items():
+                if any(keyword in text for keyword in keywords):
+                    found.add(name)
+
+        return found
+
+    def get_keywords(self) -> Dict[str, List[str]]:
+        """Get the configured keywords per category"""
+        return {name: list(keywords) for name, keywords in self.categories.items()}
@@ -8,17 +8,18 @@ import json
 import logging
 import time
 import uuid
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Literal
 from datetime import datetime, timedelta
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from pydantic import BaseModel, Field, validator
 import structlog
 from tenacity import retry, stop_after_attempt, wait_exponential
 
-from models.llama_agent import FlanT5Agent
+from models.llama_agent import FlanT5Agent, GenerationConfig
 from services.task_manager import TaskManager
 from services.security import SecurityValidator
 from services.logger import setup_logging
@@ -66,6 +67,7 @@ class AgentConfig(BaseModel):
     top_p: float = Field(default=0.9, ge=0.0, le=1.0)
     frequency_penalty: float = Field(default=0.0, ge=-2.0, le=2.0)
     presence_penalty: float = Field(default=0.0, ge=-2.0, le=2.0)
+    pipeline_mode: Optional[Literal["single", "reason+summarize", "summarize-only-if-long"]] = None  # default: settings.PIPELINE_MODE
 
 class ExternalToolEndpoints(BaseModel):
     """External tool endpoint configuration"""
@@ -93,6 +95,18 @@ class AgenticTaskRequest(BaseModel):
             raise ValueError("Invalid prompt_context format")
         return v
 
+class BatchAgenticTaskRequest(BaseModel):
+    """Request model for submitting several agentic tasks at once"""
+    tasks: List[AgenticTaskRequest] = Field(..., min_length=1)
+    
+    @validator('tasks')
+    def validate_tasks(cls, v):
+        if len(v) > settings.MAX_BATCH_SIZE:
+            raise ValueError(f"Batch size exceeds the maximum of {settings.MAX_BATCH_SIZE}")
+        if len({task.task_id for task in v}) != len(v):
+            raise ValueError("Duplicate task_id in batch")
+        return v
+
 class NextStep(BaseModel):
     """Next step instructions for the client"""
     action: str = Field(..., pattern="^(continue|complete|wait_for_tool|retry)$")
@@ -111,6 +125,28 @@ class AgenticTaskResponse(BaseModel):
     execution_time: Optional[float] = None
     tokens_used: Optional[int] = None
 
+class BatchAgenticTaskResponse(BaseModel):
+    """Response model for batched task processing, one result per submitted task"""
+    results: List[AgenticTaskResponse]
+    execution_time: float
+
+@app.on_event("startup")
+async def start_inference_scheduler():
+    """Start micro-batching of model.generate calls"""
+    if settings.INFERENCE_BATCHING:
+        scheduler = flan_agent.enable_batching(
+            max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+            batch_window_ms=settings.INFERENCE_BATCH_WINDOW_MS,
+            max_concurrent_batches=settings.INFERENCE_CONCURRENT_BATCHES
+        )
+        await scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_inference_scheduler():
+    if flan_agent.scheduler:
+        await flan_agent.scheduler.stop()
+    flan_agent.executor.shutdown(wait=False)
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -122,6 +158,19 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/inference/stats")
+async def inference_stats():
+    """Batching scheduler throughput and latency statistics"""
+    agent_stats = {
+        "inference_backend": flan_agent.backend,
+        "max_concurrent_generations": flan_agent.max_concurrent_generations,
+        "intra_op_threads": flan_agent.intra_op_threads,
+        "pipeline": flan_agent.get_pipeline_stats()
+    }
+    if not flan_agent.scheduler:
+        return {"batching": False, **agent_stats}
+    return {"batching": True, **agent_stats, **flan_agent.scheduler.get_stats()}
+
 # Main agentic task endpoint
 @app.post("/agentic-task", response_model=AgenticTaskResponse)
 async def process_agentic_task(
@@ -166,8 +215,8 @@ async def process_agentic_task(
         execution_time = time.time() - start_time
         
         # Update task status
+        task_context.update(_task_result_fields(result))
         task_context.update({
-            "status": result["status"],
             "last_updated": datetime.utcnow().isoformat(),
             "execution_time": execution_time
         })
@@ -221,24 +270,196 @@ async def process_agentic_task(
             execution_time=execution_time
         )
 
+@app.post("/agentic-task/batch", response_model=BatchAgenticTaskResponse)
+async def process_agentic_task_batch(request: BatchAgenticTaskRequest) -> BatchAgenticTaskResponse:
+    """
+    Process several agentic tasks in one call. Tasks sharing the same agent
+    configuration and tools run through the model together as a padded batch.
+    """
+    start_time = time.time()
+    logger.info("Processing agentic task batch", batch_size=len(request.tasks))
+    
+    try:
+        for item in request.tasks:
+            security_validator.validate_request(item)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    responses: Dict[str, AgenticTaskResponse] = {}
+    task_contexts: Dict[str, Dict[str, Any]] = {}
+    groups: Dict[str, List[AgenticTaskRequest]] = {}
+    
+    for item in request.tasks:
+        existing_task = await task_manager.get_task(item.task_id)
+        if existing_task:
+            responses[item.task_id] = await _resume_task(existing_task, item)
+            continue
+        
+        task_context = {
+            "task_id": item.task_id,
+            "prompt_context": item.prompt_context,
+            "agent_config": item.agent_config.dict(),
+            "external_tool_endpoints": item.external_tool_endpoints.dict(),
+            "created_at": datetime.utcnow().isoformat(),
+            "status": "in_progress",
+            "steps_completed": 0,
+            "conversation_history": []
+        }
+        await task_manager.create_task(item.task_id, task_context)
+        task_contexts[item.task_id] = task_context
+        
+        group_key = json.dumps([task_context["agent_config"], task_context["external_tool_endpoints"]], sort_keys=True)
+        groups.setdefault(group_key, []).append(item)
+    
+    for items in groups.values():
+        group_start = time.time()
+        try:
+            results = await flan_agent.process_tasks_batch(
+                prompt_contexts=[item.prompt_context for item in items],
+                task_contexts=[task_contexts[item.task_id] for item in items],
+                external_tools=items[0].external_tool_endpoints.dict(),
+                config=GenerationConfig.from_dict(items[0].agent_config.dict())
+            )
+        except Exception as e:
+            logger.error("Batch processing error", error=str(e))
+            results = [{
+                "status": "failed",
+                "agent_reply": "",
+                "next_step": {"action": "retry", "instructions": "Agent processing failed. Please retry."},
+                "logs": f"Agent error: {str(e)}",
+                "error": str(e)
+            } for _ in items]
+        execution_time = time.time() - group_start
+        
+        for item, result in zip(items, results):
+            task_context = task_contexts[item.task_id]
+            task_context.update(_task_result_fields(result))
+            task_context.update({
+                "last_updated": datetime.utcnow().isoformat(),
+                "execution_time": execution_time
+            })
+            await task_manager.update_task(item.task_id, task_context)
+            
+            responses[item.task_id] = AgenticTaskResponse(
+                task_id=item.task_id,
+                status=result["status"],
+                agent_reply=result["agent_reply"],
+                next_step=result["next_step"],
+                logs=result["logs"],
+                error=result.get("error"),
+                execution_time=execution_time,
+                tokens_used=result.get("tokens_used")
+            )
+    
+    execution_time = time.time() - start_time
+    logger.info("Task batch completed", batch_size=len(request.tasks),
+                model_batches=len(groups), execution_time=execution_time)
+    
+    return BatchAgenticTaskResponse(
+        results=[responses[item.task_id] for item in request.tasks],
+        execution_time=execution_time
+    )
+
+@app.post("/agentic-task/stream")
+async def stream_agentic_task(request: AgenticTaskRequest) -> StreamingResponse:
+    """
+    Process a task and stream the reply as Server-Sent Events: a "token" event
+    per generated chunk, then a "done" event with the full cleaned reply.
+    """
+    try:
+        security_validator.validate_request(request)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    task_id = request.task_id
+    task_context = {
+        "task_id": task_id,
+        "prompt_context": request.prompt_context,
+        "agent_config": request.agent_config.dict(),
+        "external_tool_endpoints": request.external_tool_endpoints.dict(),
+        "created_at": datetime.utcnow().isoformat(),
+        "status": "in_progress",
+        "steps_completed": 0,
+        "conversation_history": []
+    }
+    await task_manager.create_task(task_id, task_context)
+    config = GenerationConfig.from_dict(request.agent_config.dict())
+    
+    async def event_stream():
+        start_time = time.time()
+        chunks = []
+        try:
+            async for chunk in flan_agent.stream_response(request.prompt_context,
+                                                          request.external_tool_endpoints.dict(), config):
+                chunks.append(chunk)
+                yield f"event: token\ndata: {json.dumps({'text': chunk})}\n\n"
+            agent_reply = flan_agent._clean_response("".join(chunks), config.stop_sequences)
+            result = {
+                "status": "completed",
+                "agent_reply": agent_reply,
+                "next_step": {"action": "complete", "instructions": "Task completed successfully using FLAN-T5 reasoning"},
+                "logs": f"Task ID: {task_id}\nStreamed chunks: {len(chunks)}",
+                "tokens_used": flan_agent._count_tokens(request.prompt_context + agent_reply)
+            }
+        except Exception as e:
+            logger.error("Streaming task error", task_id=task_id, error=str(e))
+            result = {
+                "status": "failed",
+                "agent_reply": "",
+                "next_step": {"action": "retry", "instructions": "Agent processing failed. Please retry."},
+                "logs": f"Agent error: {str(e)}",
+                "error": str(e)
+            }
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+        
+        execution_time = time.time() - start_time
+        task_context.update(_task_result_fields(result))
+        task_context.update({
+            "last_updated": datetime.utcnow().isoformat(),
+            "execution_time": execution_time
+        })
+        await task_manager.update_task(task_id, task_context)
+        
+        done = {
+            "task_id": task_id,
+            "status": result["status"],
+            "agent_reply": result["agent_reply"],
+            "execution_time": execution_time,
+            "tokens_used": result.get("tokens_used")
+        }
+        yield f"event: done\ndata: {json.dumps(done)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Let proxies pass chunks through as they are produced
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _task_result_fields(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields of an agent result stored on the task, so status lookups can return the reply"""
+    next_step = result.get("next_step")
+    return {
+        "status": result["status"],
+        "agent_reply": result.get("agent_reply", ""),
+        "next_step": next_step.dict() if isinstance(next_step, BaseModel) else next_step,
+        "logs": result.get("logs", ""),
+        "error": result.get("error"),
+        "tokens_used": result.get("tokens_used")
+    }
+
 async def _process_task_with_agent(request: AgenticTaskRequest, task_context: Dict[str, Any]) -> Dict[str, Any]:
     """Process the task using the FLAN-T5 agent"""
     try:
-        # Configure the agent
-        flan_agent.configure(
-            temperature=request.agent_config.temperature,
-            max_tokens=request.agent_config.max_tokens,
-            stop_sequences=request.agent_config.stop_sequences,
-            top_p=request.agent_config.top_p,
-            frequency_penalty=request.agent_config.frequency_penalty,
-            presence_penalty=request.agent_config.presence_penalty
-        )
+        # Generation parameters travel with this request; the shared agent is not modified
+        config = GenerationConfig.from_dict(request.agent_config.dict())
         
         # Process the task
         result = await flan_agent.process_task(
             prompt_context=request.prompt_context,
             task_context=task_context,
-            external_tools=request.external_tool_endpoints.dict()
+            external_tools=request.external_tool_endpoints.dict(),
+            config=config
         )
         
         return result
@@ -273,6 +494,26 @@ async def _resume_task(existing_task: Dict[str, Any], request: AgenticTaskReques
     )
 
 # Task management endpoints
+@app.get("/agentic-task/{task_id}")
+async def get_agentic_task_status(task_id: str, wait: float = 0):
+    """
+    Get the status of a task. With wait > 0 this long-polls: the response is sent
+    as soon as the task completes, fails or is cancelled, or after wait seconds.
+    """
+    wait = max(0.0, min(wait, settings.LONG_POLL_MAX_WAIT))
+    try:
+        if wait:
+            task = await task_manager.wait_for_completion(task_id, wait)
+        else:
+            task = await task_manager.get_task(task_id)
+    except Exception as e:
+        logger.error("Error retrieving task", task_id=task_id, error=str(e))
+        raise HTTPException(status_code=500, detail="Internal server error")
+    
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
 @app.get("/task/{task_id}")
 async def get_task_status(task_id: str):
     """Get the status of a specific task"""
@@ -6,8 +6,12 @@ Based on Google's FLAN-T5 model - excellent for reasoning and multi-step tasks
 import asyncio
 import json
 import logging
+import os
+import queue
 import time
-from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields, asdict
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
 from datetime import datetime
 
 import torch
@@ -15,39 +19,182 @@ from transformers import (
     AutoTokenizer, 
     AutoModelForSeq2SeqLM,
     T5Tokenizer,
-    T5ForConditionalGeneration
+    T5ForConditionalGeneration,
+    TextIteratorStreamer
 )
 import structlog
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+try:
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
 from config.settings import settings
+from services.inference_scheduler import InferenceScheduler
 
 logger = structlog.get_logger()
 
+# Model backends selectable with settings.INFERENCE_BACKEND; the last two are CPU-only
+BACKEND_PYTORCH = "pytorch"
+BACKEND_PYTORCH_INT8 = "pytorch-int8"
+BACKEND_ONNX = "onnx"
+INFERENCE_BACKENDS = (BACKEND_PYTORCH, BACKEND_PYTORCH_INT8, BACKEND_ONNX)
+
+def load_model(backend: str, device: str = "cpu", model_name: str = None) -> Tuple[Any, str]:
+    """
+    Load the seq2seq model for an inference backend.
+
+    Returns (model, backend actually used): unknown backends, CPU-only backends
+    on CUDA and onnx without optimum installed fall back to pytorch.
+    """
+    model_name = model_name or settings.MODEL_NAME
+    if backend not in INFERENCE_BACKENDS:
+        logger.warning("Unknown inference backend, using pytorch", backend=backend)
+        backend = BACKEND_PYTORCH
+    elif backend != BACKEND_PYTORCH and device == "cuda":
+        logger.warning("Inference backend is CPU-only, using pytorch", backend=backend)
+        backend = BACKEND_PYTORCH
+    elif backend == BACKEND_ONNX and not ONNX_AVAILABLE:
+        logger.warning("optimum[onnxruntime] not installed, using pytorch")
+        backend = BACKEND_PYTORCH
+    
+    if backend == BACKEND_ONNX:
+        return _load_onnx_model(model_name), backend
+    
+    model = AutoModelForSeq2SeqLM.from_pretrained(
+        model_name,
+        cache_dir=settings.MODEL_CACHE_DIR,
+        torch_dtype=torch.float16 if device == "cuda" else torch.float32,
+        device_map="auto" if device == "cuda" else None,
+        trust_remote_code=True
+    )
+    if backend == BACKEND_PYTORCH_INT8:
+        # Linear layers hold nearly all of T5's weights; activations are quantized on the fly
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model, backend
+
+def _load_onnx_model(model_name: str):
+    """ONNX Runtime model with a KV-cached decoder, exported on first use and reused afterwards"""
+    export_dir = os.path.join(settings.ONNX_MODEL_DIR, model_name.replace("/", "--"))
+    if os.path.isdir(export_dir):
+        return ORTModelForSeq2SeqLM.from_pretrained(export_dir, use_cache=True)
+    
+    logger.info("📦 Exporting model to ONNX", model=model_name, export_dir=export_dir)
+    model = ORTModelForSeq2SeqLM.from_pretrained(
+        model_name,
+        export=True,
+        use_cache=True,
+        cache_dir=settings.MODEL_CACHE_DIR
+    )
+    model.save_pretrained(export_dir)
+    return model
+
+# Generation pipelines: reasoning pass only, always followed by a summarization
+# pass, or summarized only when the reasoning output is long
+PIPELINE_SINGLE = "single"
+PIPELINE_REASON_SUMMARIZE = "reason+summarize"
+PIPELINE_SUMMARIZE_IF_LONG = "summarize-only-if-long"
+PIPELINE_MODES = (PIPELINE_SINGLE, PIPELINE_REASON_SUMMARIZE, PIPELINE_SUMMARIZE_IF_LONG)
+
+@dataclass(frozen=True)
+class GenerationConfig:
+    """Generation parameters for one request; never shared or mutated between tasks"""
+    temperature: float = 0.7
+    max_tokens: int = 1000
+    stop_sequences: Tuple[str, ...] = ()
+    top_p: float = 0.9
+    frequency_penalty: float = 0.0
+    presence_penalty: float = 0.0
+    pipeline_mode: Optional[str] = None  # None uses settings.PIPELINE_MODE
+    
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> "GenerationConfig":
+        """Build from an agent_config dict, ignoring unknown keys"""
+        names = {f.name for f in fields(cls)}
+        values = {key: value for key, value in config.items() if key in names and value is not None}
+        if "stop_sequences" in values:
+            values["stop_sequences"] = tuple(values["stop_sequences"])
+        return cls(**values)
+    
+    def generate_kwargs(self) -> Dict[str, Any]:
+        """Sampling parameters passed to model.generate"""
+        return {
+            "max_length": self.max_tokens,
+            "temperature": self.temperature,
+            "top_p": self.top_p
+        }
+
+@dataclass(frozen=True)
+class TaskRun:
+    """State of one task being processed, owned by that request alone"""
+    task_id: Optional[str]
+    config: GenerationConfig
+    conversation_history: List[Dict[str, Any]] = field(default_factory=list)
+
 class FlanT5Agent:
     """
     Autonomous agent powered by FLAN-T5 Small for multi-step workflows
     FLAN-T5 is excellent for reasoning, translation, and text generation tasks
     """
     
+    # How long a streaming read waits for the next chunk before checking the generation again
+    STREAM_READ_TIMEOUT = 1.0
+    
     def __init__(self):
         self.model = None
         self.tokenizer = None
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.backend = None
         self.is_initialized = False
         
-        # Agent configuration
-        self.temperature = 0.7
-        self.max_tokens = 1000
-        self.stop_sequences = []
-        self.top_p = 0.9
-        self.frequency_penalty = 0.0
-        self.presence_penalty = 0.0
+        # Used when a request doesn't pass its own GenerationConfig; per-task state
+        # lives in TaskRun so concurrent tasks never touch shared attributes
+        self.default_config = GenerationConfig()
+        
+        # model.generate is CPU-bound and blocks, so every generate path (scheduler,
+        # batch endpoint, streaming) runs on this one pool; its size is the single
+        # limit on concurrent generations, and the cores are split by it.
+        # Unbatched, every request's generate can run at once, but no more usefully than one per core
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self._set_parallelism(min(settings.MAX_CONCURRENT_TASKS, os.cpu_count() or 1))
         
-        # Task processing state
-        self.current_task_id = None
-        self.conversation_history = []
-        self.tool_results = {}
+        # Micro-batching of concurrent generate calls (see enable_batching)
+        self.scheduler: Optional[InferenceScheduler] = None
+        
+        # End-to-end task latency per pipeline mode
+        self.pipeline_stats = {mode: {"tasks": 0, "summarized": 0, "total_latency": 0.0, "max_latency": 0.0}
+                               for mode in PIPELINE_MODES}
+    
+    def _set_parallelism(self, parallel_generations: int):
+        """Size the inference pool and torch threads for this many concurrent generations"""
+        self.max_concurrent_generations = max(1, parallel_generations)
+        if self.executor is not None:
+            # Generations already running finish on the old pool
+            self.executor.shutdown(wait=False)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrent_generations,
+                                           thread_name_prefix="flan-t5-generate")
+        self.intra_op_threads = self._configure_torch_threads(self.max_concurrent_generations)
+    
+    def _configure_torch_threads(self, parallel_generations: int) -> int:
+        """Split the CPU cores between the generations that actually run in parallel"""
+        threads = settings.INFERENCE_THREADS or max(1, (os.cpu_count() or 1) // parallel_generations)
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Can only be set once, before any parallel work has started
+            pass
+        logger.info("Inference threads configured",
+                   parallel_generations=parallel_generations,
+                   intra_op_threads=threads)
+        return threads
+    
+    async def _run_inference(self, fn, *args):
+        """Run a blocking model call on the inference pool without stalling the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
         
     async def initialize(self):
         """Initialize the FLAN-T5 model and tokenizer with error handling"""
@@ -68,15 +215,9 @@ class FlanT5Agent:
             logger.info("✅ Tokenizer loaded successfully")
             
             # Load model - FLAN-T5 is a sequence-to-sequence model
-            logger.info("📥 Loading FLAN-T5 model...")
-            self.model = AutoModelForSeq2SeqLM.from_pretrained(
-                settings.MODEL_NAME,
-                cache_dir=settings.MODEL_CACHE_DIR,
-                torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
-                device_map="auto" if self.device == "cuda" else None,
-                trust_remote_code=True
-            )
-            logger.info("✅ Model loaded successfully")
+            logger.info("📥 Loading FLAN-T5 model...", backend=settings.INFERENCE_BACKEND)
+            self.model, self.backend = load_model(settings.INFERENCE_BACKEND, self.device)
+            logger.info("✅ Model loaded successfully", backend=self.backend)
             
             # Move model to device if not using device_map
             if self.device == "cuda" and not hasattr(self.model, 'hf_device_map'):
@@ -104,6 +245,7 @@ class FlanT5Agent:
                     torch_dtype=torch.float32,
                     trust_remote_code=True
                 )
+                self.backend = BACKEND_PYTORCH
                 self.is_initialized = True
                 logger.info("✅ Fallback initialization successful")
             except Exception as fallback_error:
@@ -111,21 +253,27 @@ class FlanT5Agent:
                 # Don't raise - allow service to continue without AI
                 self.is_initialized = False
     
+    def enable_batching(self, max_batch_size: int = 8, batch_window_ms: float = 10.0,
+                        max_concurrent_batches: int = 2) -> InferenceScheduler:
+        """Route single-prompt generation through a micro-batching scheduler"""
+        # Requests now share a few batched generate calls, so the pool shrinks to
+        # that many workers and each call gets a larger share of the cores
+        self._set_parallelism(min(max_concurrent_batches, settings.MAX_CONCURRENT_TASKS))
+        self.scheduler = InferenceScheduler(self._generate_batch, max_batch_size=max_batch_size,
+                                            batch_window_ms=batch_window_ms, executor=self.executor,
+                                            max_concurrent_batches=self.max_concurrent_generations)
+        return self.scheduler
+    
     def configure(self, **kwargs):
-        """Configure agent parameters"""
-        self.temperature = kwargs.get('temperature', self.temperature)
-        self.max_tokens = kwargs.get('max_tokens', self.max_tokens)
-        self.stop_sequences = kwargs.get('stop_sequences', self.stop_sequences)
-        self.top_p = kwargs.get('top_p', self.top_p)
-        self.frequency_penalty = kwargs.get('frequency_penalty', self.frequency_penalty)
-        self.presence_penalty = kwargs.get('presence_penalty', self.presence_penalty)
+        """Set the default generation parameters for requests without their own config"""
+        self.default_config = GenerationConfig.from_dict({**asdict(self.default_config), **kwargs})
         
         logger.info("Agent configured", 
-                   temperature=self.temperature,
-                   max_tokens=self.max_tokens)
+                   temperature=self.default_config.temperature,
+                   max_tokens=self.default_config.max_tokens)
     
     async def process_task(self, prompt_context: str, task_context: Dict[str, Any], 
-                          external_tools: Dict[str, Any]) -> Dict[str, Any]:
+                          external_tools: Dict[str, Any], config: GenerationConfig = None) -> Dict[str, Any]:
         """
         Process an agentic task with autonomous multi-step workflows using FLAN-T5
         """
@@ -135,25 +283,22 @@ class FlanT5Agent:
             logger.info("🔧 Model not initialized, attempting initialization...")
             await self.initialize()
         
-        self.current_task_id = task_context.get("task_id")
-        self.conversation_history = task_context.get("conversation_history", [])
+        run = TaskRun(
+            task_id=task_context.get("task_id"),
+            config=config or self.default_config,
+            conversation_history=list(task_context.get("conversation_history", []))
+        )
         
         try:
-            logger.info("🚀 Starting agentic task processing with FLAN-T5", task_id=self.current_task_id)
+            logger.info("🚀 Starting agentic task processing with FLAN-T5", task_id=run.task_id)
             
             # Check if model is available
             if not self.is_initialized or not self.model:
                 logger.warning("⚠️ AI model not available, using fallback response")
-                return {
-                    "status": "completed",
-                    "agent_reply": f"I'm here to help with your engineering project! Based on your request: '{prompt_context}', I can assist with technical documentation, project planning, and content analysis. However, my AI model is currently unavailable, so I'm providing this basic response. Please try again later when the AI service is fully loaded.",
-                    "next_step": {
-                        "action": "complete",
-                        "instructions": "Task completed with fallback response"
-                    },
-                    "logs": "AI model not available - using fallback",
-                    "tokens_used": 0
-                }
+                return self._fallback_result(prompt_context)
+            
+            mode = self._pipeline_mode(run.config)
+            started_at = time.time()
             
             # FLAN-T5 excels at reasoning tasks, so we'll structure the prompt accordingly
             logger.info("📝 Building reasoning prompt...")
@@ -162,7 +307,7 @@ class FlanT5Agent:
             
             # Generate the main response using FLAN-T5's reasoning capabilities
             logger.info("🧠 Generating AI response...")
-            main_response = await self._generate_reasoning_response(reasoning_prompt)
+            main_response = await self._generate_reasoning_response(reasoning_prompt, run)
             logger.info("✅ AI response generated")
             
             # If external tools are available, try to use them
@@ -175,9 +320,16 @@ class FlanT5Agent:
                 logger.info("ℹ️ No external tools available, using base response")
             
             # Generate final structured response
-            logger.info("📋 Generating final structured response...")
-            final_response = await self._generate_final_response(enhanced_response, prompt_context)
-            logger.info("✅ Final response generated")
+            if self._needs_summary(mode, enhanced_response):
+                logger.info("📋 Generating final structured response...")
+                final_response = await self._generate_final_response(enhanced_response, prompt_context, run)
+                logger.info("✅ Final response generated")
+                summarized = 1
+            else:
+                logger.info("ℹ️ Skipping summarization pass", pipeline_mode=mode)
+                final_response = enhanced_response
+                summarized = 0
+            self._record_pipeline(mode, time.time() - started_at, tasks=1, summarized=summarized)
             
             logger.info("🎉 Task processing completed successfully")
             return {
@@ -187,12 +339,12 @@ class FlanT5Agent:
                     "action": "complete",
                     "instructions": "Task completed successfully using FLAN-T5 reasoning"
                 },
-                "logs": self._format_logs(),
+                "logs": self._format_logs(run),
                 "tokens_used": self._count_tokens(prompt_context + final_response)
             }
             
         except Exception as e:
-            logger.error("❌ Task processing failed", task_id=self.current_task_id, error=str(e))
+            logger.error("❌ Task processing failed", task_id=run.task_id, error=str(e))
             return {
                 "status": "failed",
                 "agent_reply": f"I encountered an error while processing your request: {str(e)}. Please try again or contact support if the issue persists.",
@@ -200,9 +352,208 @@ class FlanT5Agent:
                     "action": "retry",
                     "instructions": f"Task failed: {str(e)}"
                 },
-                "logs": self._format_logs(),
+                "logs": self._format_logs(run),
                 "error": str(e)
             }
+        finally:
+            # The caller persists task_context, so hand it the turns generated here
+            task_context["conversation_history"] = run.conversation_history
+    
+    async def process_tasks_batch(self, prompt_contexts: List[str], task_contexts: List[Dict[str, Any]],
+                                  external_tools: Dict[str, Any], config: GenerationConfig = None) -> List[Dict[str, Any]]:
+        """
+        Process several tasks together: each generation step runs once for the
+        whole batch with padded inputs instead of once per task
+        """
+        config = config or self.default_config
+        task_ids = [task_context.get("task_id") for task_context in task_contexts]
+        logger.info("🤖 Starting batched AI task processing", batch_size=len(prompt_contexts))
+        
+        if not self.is_initialized:
+            logger.info("🔧 Model not initialized, attempting initialization...")
+            await self.initialize()
+        
+        if not self.is_initialized or not self.model:
+            logger.warning("⚠️ AI model not available, using fallback responses")
+            return [self._fallback_result(prompt_context) for prompt_context in prompt_contexts]
+        
+        try:
+            mode = self._pipeline_mode(config)
+            started_at = time.time()
+            
+            reasoning_prompts = [self._build_reasoning_prompt(prompt_context, external_tools)
+                                 for prompt_context in prompt_contexts]
+            main_responses = [self._clean_response(response, config.stop_sequences)
+                              for response in await self._run_inference(self._generate_batch, reasoning_prompts,
+                                                                        config.generate_kwargs())]
+            
+            if external_tools:
+                enhanced_responses = [await self._enhance_with_tools(response, external_tools)
+                                      for response in main_responses]
+            else:
+                enhanced_responses = main_responses
+            
+            # Only the tasks that need it go through the summarization pass
+            final_responses = list(enhanced_responses)
+            to_summarize = [i for i, response in enumerate(enhanced_responses) if self._needs_summary(mode, response)]
+            if to_summarize:
+                final_prompts = [self._build_final_prompt(enhanced_responses[i], prompt_contexts[i])
+                                 for i in to_summarize]
+                summaries = await self._run_inference(self._generate_batch, final_prompts, config.generate_kwargs())
+                for i, summary in zip(to_summarize, summaries):
+                    final_responses[i] = self._clean_response(summary, config.stop_sequences)
+            self._record_pipeline(mode, time.time() - started_at, tasks=len(prompt_contexts),
+                                  summarized=len(to_summarize))
+            
+            logger.info("🎉 Batched task processing completed", batch_size=len(prompt_contexts))
+            return [{
+                "status": "completed",
+                "agent_reply": final_response,
+                "next_step": {
+                    "action": "complete",
+                    "instructions": "Task completed successfully using FLAN-T5 reasoning"
+                },
+                "logs": f"Task ID: {task_id}\nModel: {settings.MODEL_NAME} (FLAN-T5 Small)\n"
+                        f"Device: {self.device}\nBatch size: {len(prompt_contexts)}\n"
+                        f"Timestamp: {datetime.utcnow().isoformat()}",
+                "tokens_used": self._count_tokens(prompt_context + final_response)
+            } for task_id, prompt_context, final_response in zip(task_ids, prompt_contexts, final_responses)]
+            
+        except Exception as e:
+            logger.error("❌ Batched task processing failed", error=str(e))
+            return [{
+                "status": "failed",
+                "agent_reply": f"I encountered an error while processing your request: {str(e)}. Please try again or contact support if the issue persists.",
+                "next_step": {
+                    "action": "retry",
+                    "instructions": f"Task failed: {str(e)}"
+                },
+                "logs": f"Task ID: {task_id}\nBatch error: {str(e)}",
+                "error": str(e)
+            } for task_id in task_ids]
+    
+    async def stream_response(self, prompt_context: str, external_tools: Dict[str, Any] = None,
+                              config: GenerationConfig = None) -> AsyncIterator[str]:
+        """
+        Yield the reasoning response as it is generated, chunk by chunk.
+
+        Streaming runs the reasoning pass only: the summarization pass needs the
+        full first output, which would delay the first token until it is done.
+        """
+        if not self.is_initialized:
+            await self.initialize()
+        
+        if not self.is_initialized or not self.model:
+            logger.warning("⚠️ AI model not available, streaming fallback response")
+            yield self._fallback_result(prompt_context)["agent_reply"]
+            return
+        
+        prompt = self._build_reasoning_prompt(prompt_context, external_tools or {})
+        inputs = self.tokenizer(prompt, return_tensors="pt", truncation=True, max_length=512)
+        if self.device == "cuda":
+            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True,
+                                        timeout=self.STREAM_READ_TIMEOUT)
+        generation_kwargs = dict(
+            **inputs,
+            **(config or self.default_config).generate_kwargs(),
+            do_sample=True,
+            num_return_sequences=1,
+            pad_token_id=self.tokenizer.pad_token_id,
+            eos_token_id=self.tokenizer.eos_token_id,
+            streamer=streamer
+        )
+        
+        # Generation takes a slot on the inference pool like any other request
+        loop = asyncio.get_running_loop()
+        generation = loop.run_in_executor(self.executor, self._generate_into_streamer, generation_kwargs, streamer)
+        
+        try:
+            # Each read blocks until the next decoded chunk, so wait for it off the event loop;
+            # the timeout keeps reader threads from waiting forever on a generation that never ran
+            while True:
+                try:
+                    chunk = await loop.run_in_executor(None, next, streamer, None)
+                except queue.Empty:
+                    if generation.done():
+                        break
+                    continue
+                if chunk is None:
+                    break
+                if chunk:
+                    yield chunk
+            # Raises here if generation failed, so the caller doesn't mistake a cut-off stream for a result
+            await generation
+        finally:
+            # Client went away: drop a generation still queued for the pool, and retrieve
+            # the outcome of one already running so its failure isn't reported as unhandled
+            generation.cancel()
+            generation.add_done_callback(lambda future: future.cancelled() or future.exception())
+    
+    def _generate_into_streamer(self, generation_kwargs: Dict[str, Any], streamer: TextIteratorStreamer):
+        """
+        Generation thread for stream_response. On error the stream is ended so
+        the reader stops, and the exception is re-raised to the awaiting caller.
+        """
+        try:
+            with torch.no_grad():
+                self.model.generate(**generation_kwargs)
+        except Exception as e:
+            logger.error("FLAN-T5 streaming generation failed", error=str(e))
+            streamer.end()
+            raise
+    
+    def _pipeline_mode(self, config: GenerationConfig) -> str:
+        """Pipeline for this request, falling back to the configured default"""
+        mode = config.pipeline_mode or settings.PIPELINE_MODE
+        if mode not in PIPELINE_MODES:
+            logger.warning("Unknown pipeline mode, using reason+summarize", pipeline_mode=mode)
+            return PIPELINE_REASON_SUMMARIZE
+        return mode
+    
+    def _needs_summary(self, mode: str, response: str) -> bool:
+        """Whether a reasoning output goes through the second, summarizing generation"""
+        if mode == PIPELINE_SINGLE:
+            return False
+        if mode == PIPELINE_SUMMARIZE_IF_LONG:
+            return self._count_tokens(response) > settings.SUMMARIZE_MIN_TOKENS
+        return True
+    
+    def _record_pipeline(self, mode: str, latency: float, tasks: int, summarized: int):
+        """Record completed tasks; every task in a batch waited for the whole batch"""
+        stats = self.pipeline_stats[mode]
+        stats["tasks"] += tasks
+        stats["summarized"] += summarized
+        stats["total_latency"] += latency * tasks
+        stats["max_latency"] = max(stats["max_latency"], latency)
+    
+    def get_pipeline_stats(self) -> Dict[str, Any]:
+        """Task count and latency per pipeline mode"""
+        return {
+            "default_mode": settings.PIPELINE_MODE,
+            "modes": {
+                mode: {
+                    "tasks": stats["tasks"],
+                    "summarized": stats["summarized"],
+                    "avg_latency_ms": 1000 * stats["total_latency"] / stats["tasks"] if stats["tasks"] else 0.0,
+                    "max_latency_ms": 1000 * stats["max_latency"]
+                } for mode, stats in self.pipeline_stats.items()
+            }
+        }
+    
+    def _fallback_result(self, prompt_context: str) -> Dict[str, Any]:
+        """Result returned when the model could not be loaded"""
+        return {
+            "status": "completed",
+            "agent_reply": f"I'm here to help with your engineering project! Based on your request: '{prompt_context}', I can assist with technical documentation, project planning, and content analysis. However, my AI model is currently unavailable, so I'm providing this basic response. Please try again later when the AI service is fully loaded.",
+            "next_step": {
+                "action": "complete",
+                "instructions": "Task completed with fallback response"
+            },
+            "logs": "AI model not available - using fallback",
+            "tokens_used": 0
+        }
     
     def _build_reasoning_prompt(self, prompt_context: str, external_tools: Dict[str, Any]) -> str:
         """Build a reasoning prompt optimized for FLAN-T5's capabilities"""
@@ -271,42 +622,25 @@ Format your response clearly with numbered steps and detailed explanations.
             logger.warning("External tool call failed", tool_name=tool_name, error=str(e))
             return None
     
-    async def _generate_reasoning_response(self, prompt: str) -> str:
+    async def _generate_reasoning_response(self, prompt: str, run: TaskRun) -> str:
         """Generate response using FLAN-T5's reasoning capabilities"""
         try:
-            # Tokenize input
-            inputs = self.tokenizer(prompt, return_tensors="pt", truncation=True, max_length=512)
-            
-            # Move to device if needed
-            if self.device == "cuda":
-                inputs = {k: v.to(self.device) for k, v in inputs.items()}
-            
-            # Generate response with FLAN-T5
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    **inputs,
-                    max_length=self.max_tokens,
-                    temperature=self.temperature,
-                    do_sample=True,
-                    top_p=self.top_p,
-                    num_return_sequences=1,
-                    pad_token_id=self.tokenizer.pad_token_id,
-                    eos_token_id=self.tokenizer.eos_token_id
-                )
-            
-            # Decode response
-            response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+            generation_params = run.config.generate_kwargs()
+            if self.scheduler is not None:
+                # Shares a padded model.generate call with concurrent requests
+                response = await self.scheduler.submit(prompt, generation_params)
+            else:
+                response = (await self._run_inference(self._generate_batch, [prompt], generation_params))[0]
             
-            # Clean up the response
-            cleaned_response = self._clean_response(response)
+            cleaned_response = self._clean_response(response, run.config.stop_sequences)
             
             # Add to conversation history
-            self.conversation_history.append({
+            run.conversation_history.append({
                 "role": "user",
                 "content": prompt,
                 "timestamp": datetime.utcnow().isoformat()
             })
-            self.conversation_history.append({
+            run.conversation_history.append({
                 "role": "assistant",
                 "content": cleaned_response,
                 "timestamp": datetime.utcnow().isoformat()
@@ -318,11 +652,38 @@ Format your response clearly with numbered steps and detailed explanations.
             logger.error("FLAN-T5 generation failed", error=str(e))
             raise
     
-    async def _generate_final_response(self, enhanced_response: str, original_prompt: str) -> str:
+    def _generate_batch(self, prompts: List[str], generation_params: Dict[str, Any] = None) -> List[str]:
+        """Generate one raw decoded response per prompt in a single padded model.generate call"""
+        if generation_params is None:
+            generation_params = self.default_config.generate_kwargs()
+        
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True, truncation=True, max_length=512)
+        
+        # Move to device if needed
+        if self.device == "cuda":
+            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        
+        with torch.no_grad():
+            outputs = self.model.generate(
+                **inputs,
+                **generation_params,
+                do_sample=True,
+                num_return_sequences=1,
+                pad_token_id=self.tokenizer.pad_token_id,
+                eos_token_id=self.tokenizer.eos_token_id
+            )
+        
+        return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+    
+    async def _generate_final_response(self, enhanced_response: str, original_prompt: str, run: TaskRun) -> str:
         """Generate the final structured response"""
         
         # Use FLAN-T5 to summarize and structure the final response
-        final_prompt = f"""
+        return await self._generate_reasoning_response(self._build_final_prompt(enhanced_response, original_prompt), run)
+    
+    def _build_final_prompt(self, enhanced_response: str, original_prompt: str) -> str:
+        """Build the prompt that summarizes and structures a response"""
+        return f"""
 Summarize and structure the following response into a clear, professional format:
 
 Original question: {original_prompt}
@@ -338,13 +699,11 @@ Please provide a well-structured final answer that is:
 
 Format your response with clear headings and bullet points where appropriate.
 """
-        
-        return await self._generate_reasoning_response(final_prompt)
     
-    def _clean_response(self, text: str) -> str:
+    def _clean_response(self, text: str, stop_sequences: Tuple[str, ...] = ()) -> str:
         """Clean and format the generated response"""
         # Remove stop sequences
-        for stop_seq in self.stop_sequences:
+        for stop_seq in stop_sequences:
             if stop_seq in text:
                 text = text.split(stop_seq)[0]
         
@@ -363,14 +722,14 @@ Format your response with clear headings and bullet points where appropriate.
             return 0
         return len(self.tokenizer.encode(text))
     
-    def _format_logs(self) -> str:
+    def _format_logs(self, run: TaskRun) -> str:
         """Format execution logs"""
         logs = []
-        logs.append(f"Task ID: {self.current_task_id}")
+        logs.append(f"Task ID: {run.task_id}")
         logs.append(f"Model: {settings.MODEL_NAME} (FLAN-T5 Small)")
         logs.append(f"Model Size: 80M parameters (300MB)")
         logs.append(f"Device: {self.device}")
-        logs.append(f"Conversation turns: {len(self.conversation_history)}")
+        logs.append(f"Conversation turns: {len(run.conversation_history)}")
         logs.append(f"Timestamp: {datetime.utcnow().isoformat()}")
         
         return "\n".join(logs)
@@ -0,0 +1,190 @@
+"""
+Dynamic micro-batching scheduler for model inference
+Collects concurrent generation requests into padded batches
+"""
+
+import asyncio
+import time
+import json
+from concurrent.futures import Executor
+from typing import Dict, Any, List, Callable, Optional, Set, Tuple
+
+import structlog
+
+logger = structlog.get_logger()
+
+# Sync function that generates one response per prompt with the given parameters
+BatchGenerateFn = Callable[[List[str], Dict[str, Any]], List[str]]
+
+class InferenceScheduler:
+    """
+    Queues prompts from concurrent requests and runs them through the model in
+    batches. A batch is dispatched once max_batch_size prompts are waiting or
+    batch_window_ms has passed since the first one arrived. Only prompts with
+    identical generation parameters share a batch. Up to max_concurrent_batches
+    batches run at once (size it to the executor); while all are busy, new
+    prompts keep queueing and form the next, larger batch. Results are fanned
+    back out to the awaiting coroutines.
+    """
+
+    def __init__(self, generate_batch: BatchGenerateFn, max_batch_size: int = 8,
+                 batch_window_ms: float = 10.0, executor: Optional[Executor] = None,
+                 max_concurrent_batches: int = 1):
+        self.generate_batch = generate_batch
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window_ms / 1000.0
+        self.executor = executor
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker_task: Optional[asyncio.Task] = None
+        self.batch_slots: Optional[asyncio.Semaphore] = None
+        self.batch_tasks: Set[asyncio.Task] = set()
+
+        # Stats
+        self.started_at = None
+        self.total_requests = 0
+        self.total_batches = 0
+        self.failed_batches = 0
+        self.max_batch_seen = 0
+        self.total_queue_wait = 0.0
+        self.total_inference_time = 0.0
+
+    async def start(self):
+        """Start the batching worker on the running event loop"""
+        if self.worker_task and not self.worker_task.done():
+            return
+        self.queue = asyncio.Queue()
+        self.batch_slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self.started_at = time.time()
+        self.worker_task = asyncio.create_task(self._worker())
+        logger.info("Inference scheduler started",
+                   max_batch_size=self.max_batch_size,
+                   batch_window_ms=self.batch_window * 1000)
+
+    async def stop(self):
+        """Stop the worker; requests still queued or generating fail with CancelledError"""
+        if self.worker_task:
+            self.worker_task.cancel()
+            try:
+                await self.worker_task
+            except asyncio.CancelledError:
+                pass
+            self.worker_task = None
+
+        batch_tasks = list(self.batch_tasks)
+        for task in batch_tasks:
+            task.cancel()
+        await asyncio.gather(*batch_tasks, return_exceptions=True)
+
+        while self.queue and not self.queue.empty():
+            _, _, future, _ = self.queue.get_nowait()
+            if not future.done():
+                future.cancel()
+
+    @property
+    def is_running(self) -> bool:
+        return self.worker_task is not None and not self.worker_task.done()
+
+    async def submit(self, prompt: str, generation_params: Dict[str, Any]) -> str:
+        """Queue a prompt and wait for its generated response"""
+        if not self.is_running:
+            await self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((prompt, generation_params, future, time.time()))
+        return await future
+
+    async def _worker(self):
+        """Collect requests into batches and dispatch them"""
+        while True:
+            pending = []
+            try:
+                pending.append(await self.queue.get())
+                deadline = time.time() + self.batch_window
+
+                while len(pending) < self.max_batch_size:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        pending.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+                    except asyncio.TimeoutError:
+                        break
+
+                # Prompts can only share a model.generate call if their parameters match
+                groups: Dict[str, List[Tuple]] = {}
+                for item in pending:
+                    groups.setdefault(json.dumps(item[1], sort_keys=True), []).append(item)
+
+                for items in groups.values():
+                    await self.batch_slots.acquire()
+                    task = asyncio.create_task(self._run_batch(items))
+                    self.batch_tasks.add(task)
+                    task.add_done_callback(self._batch_done)
+            except asyncio.CancelledError:
+                # Requests collected but not yet dispatched would otherwise wait forever
+                for _, _, future, _ in pending:
+                    if not future.done():
+                        future.cancel()
+                raise
+
+    def _batch_done(self, task: asyncio.Task):
+        """Free the batch's slot for the next dispatch"""
+        self.batch_tasks.discard(task)
+        self.batch_slots.release()
+
+    async def _run_batch(self, items: List[Tuple]):
+        """Generate one batch and resolve its futures"""
+        prompts = [item[0] for item in items]
+        generation_params = items[0][1]
+        dispatched_at = time.time()
+
+        try:
+            loop = asyncio.get_running_loop()
+            responses = await loop.run_in_executor(self.executor, self.generate_batch, prompts, generation_params)
+        except asyncio.CancelledError:
+            for _, _, future, _ in items:
+                if not future.done():
+                    future.cancel()
+            raise
+        except Exception as e:
+            self.failed_batches += 1
+            logger.error("Batched inference failed", batch_size=len(items), error=str(e))
+            for _, _, future, _ in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        inference_time = time.time() - dispatched_at
+        self.total_batches += 1
+        self.total_requests += len(items)
+        self.max_batch_seen = max(self.max_batch_seen, len(items))
+        self.total_inference_time += inference_time
+
+        for (_, _, future, queued_at), response in zip(items, responses):
+            self.total_queue_wait += dispatched_at - queued_at
+            if not future.done():
+                future.set_result(response)
+
+        logger.debug("Batch generated", batch_size=len(items), inference_time=inference_time)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Throughput and latency statistics"""
+        uptime = time.time() - self.started_at if self.started_at else 0.0
+        return {
+            "running": self.is_running,
+            "queued": self.queue.qsize() if self.queue else 0,
+            "max_batch_size": self.max_batch_size,
+            "max_concurrent_batches": self.max_concurrent_batches,
+            "batches_in_flight": len(self.batch_tasks),
+            "batch_window_ms": self.batch_window * 1000,
+            "total_requests": self.total_requests,
+            "total_batches": self.total_batches,
+            "failed_batches": self.failed_batches,
+            "max_batch_seen": self.max_batch_seen,
+            "avg_batch_size": self.total_requests / self.total_batches if self.total_batches else 0.0,
+            "avg_queue_wait_ms": 1000 * self.total_queue_wait / self.total_requests if self.total_requests else 0.0,
+            "avg_batch_latency_ms": 1000 * self.total_inference_time / self.total_batches if self.total_batches else 0.0,
+            "requests_per_second": self.total_requests / uptime if uptime else 0.0
+        }
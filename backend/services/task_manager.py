@@ -19,6 +19,8 @@ from config.settings import settings
 
 logger = structlog.get_logger()
 
+TERMINAL_STATUSES = {"completed", "failed", "cancelled"}
+
 class TaskManager:
     """
     Manages stateful task context with Redis backend and in-memory fallback
@@ -29,6 +31,9 @@ class TaskManager:
         self.in_memory_tasks = {}  # Fallback storage
         self.task_timeouts = {}
         self.is_redis_connected = False
+        self.completion_events: Dict[str, asyncio.Event] = {}
+        # How often a waiter re-reads the task, to catch updates made by other workers via Redis
+        self.completion_recheck_interval = 1.0
         
     async def initialize(self):
         """Initialize the task manager with Redis connection"""
@@ -125,6 +130,12 @@ class TaskManager:
                 # Reset timeout
                 self.task_timeouts[task_id] = time.time() + settings.TASK_TIMEOUT
             
+            # Wake up long-polling waiters
+            if current_task.get("status") in TERMINAL_STATUSES:
+                event = self.completion_events.pop(task_id, None)
+                if event:
+                    event.set()
+            
             logger.info("Task updated", task_id=task_id)
             return True
             
@@ -132,6 +143,29 @@ class TaskManager:
             logger.error("Failed to update task", task_id=task_id, error=str(e))
             return False
     
+    async def wait_for_completion(self, task_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Long-poll: return the task once it reaches a terminal status, or its
+        current state when timeout seconds pass first (None if it doesn't exist)
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        
+        while True:
+            task = await self.get_task(task_id)
+            if task is None or task.get("status") in TERMINAL_STATUSES:
+                return task
+            
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return task
+            
+            event = self.completion_events.setdefault(task_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), timeout=min(remaining, self.completion_recheck_interval))
+            except asyncio.TimeoutError:
+                pass
+    
     async def cancel_task(self, task_id: str) -> bool:
         """Cancel a running task"""
         try:
@@ -274,6 +308,9 @@ class TaskManager:
                 del self.in_memory_tasks[task_id]
             if task_id in self.task_timeouts:
                 del self.task_timeouts[task_id]
+            event = self.completion_events.pop(task_id, None)
+            if event:
+                event.set()
         except Exception as e:
             logger.error("Failed to cleanup task", task_id=task_id, error=str(e))
     